@@ -1,3 +1,4 @@
 # We use this class for global variables
 class DS:
     waku_nodes = []
+    leased_nodes = []
@@ -16,6 +16,7 @@ def get_env_var(var_name, default=None):
 # Configuration constants. Need to be upercase to appear in reports
 DEFAULT_NWAKU = "wakuorg/nwaku:latest"
 DEFAULT_GOWAKU = "wakuorg/go-waku:latest"
+POSTGRES_IMAGE = "postgres:15.4-alpine3.18"
 STRESS_ENABLED = False
 NODE_1 = get_env_var("NODE_1", DEFAULT_NWAKU)
 NODE_2 = get_env_var("NODE_2", DEFAULT_NWAKU)
@@ -28,9 +29,31 @@ IP_RANGE = get_env_var("IP_RANGE", "172.18.0.0/24")
 GATEWAY = get_env_var("GATEWAY", "172.18.0.1")
 RUNNING_IN_CI = get_env_var("CI")
 API_REQUEST_TIMEOUT = get_env_var("API_REQUEST_TIMEOUT", 20)
+# off, sampled (every REST_LOG_SAMPLE_RATE-th call), truncated (bodies cut at REST_LOG_MAX_CHARS) or full
+REST_LOG_MODE = get_env_var("REST_LOG_MODE", "full")
+REST_LOG_SAMPLE_RATE = get_env_var("REST_LOG_SAMPLE_RATE", 10)
+REST_LOG_MAX_CHARS = get_env_var("REST_LOG_MAX_CHARS", 1000)
+REST_LATENCY_DIR = get_env_var("REST_LATENCY_DIR", "./log/latency")
+# seconds of the pytest timeout of a test that retry waits leave for its assertions and teardown
+WAIT_BUDGET_MARGIN = get_env_var("WAIT_BUDGET_MARGIN", 30)
+# setup fixtures lease their poolable nodes from src.node.node_pool, false starts a fresh node per test
+USE_NODE_POOL = get_env_var("USE_NODE_POOL", "false")
 RLN_CREDENTIALS = get_env_var("RLN_CREDENTIALS")
 PG_USER = get_env_var("POSTGRES_USER", "postgres")
 PG_PASS = get_env_var("POSTGRES_PASSWORD", "test123")
+# where the tests reach the postgres container directly, nodes use its name on the docker network
+PG_HOST = get_env_var("POSTGRES_HOST", "127.0.0.1")
+PG_PORT = get_env_var("POSTGRES_PORT", 5432)
+# benchmarks in tests/benchmarks are skipped unless RUN_BENCHMARKS is true
+RUN_BENCHMARKS = get_env_var("RUN_BENCHMARKS", "false")
+BENCHMARK_RESULTS_DIR = get_env_var("BENCHMARK_RESULTS_DIR", "./log/benchmarks")
+STORE_BENCHMARK_VOLUMES = get_env_var("STORE_BENCHMARK_VOLUMES", "10000,100000,1000000")
+STORE_BENCHMARK_WARMUP = get_env_var("STORE_BENCHMARK_WARMUP", 3)
+STORE_BENCHMARK_REPETITIONS = get_env_var("STORE_BENCHMARK_REPETITIONS", 20)
+STORE_SYNC_BENCHMARK_MESSAGES = get_env_var("STORE_SYNC_BENCHMARK_MESSAGES", "10,1000,100000")
+STORE_SYNC_BENCHMARK_NODES = get_env_var("STORE_SYNC_BENCHMARK_NODES", "2,5,10")
+STORE_SYNC_BENCHMARK_INTERVAL = get_env_var("STORE_SYNC_BENCHMARK_INTERVAL", 10)
+STORE_SYNC_BENCHMARK_TIMEOUT = get_env_var("STORE_SYNC_BENCHMARK_TIMEOUT", 900)
 
 # example for .env file
 # RLN_CREDENTIALS = {"rln-relay-cred-password": "password", "rln-relay-eth-client-address": "wss://sepolia.infura.io/ws/v3/api_key",  "rln-relay-eth-contract-address": "0xF471d71E9b1455bBF4b85d475afb9BB0954A29c4",  "rln-relay-eth-private-key-1": "1111111111111111111111111111111111111111111111111111111111111111",  "rln-relay-eth-private-key-2": "1111111111111111111111111111111111111111111111111111111111111111"}
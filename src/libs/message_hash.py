@@ -0,0 +1,47 @@
+import base64
+import hashlib
+from collections import namedtuple
+
+MessageHash = namedtuple("MessageHash", ["hex", "base64"])
+
+# big enough for the largest seeded stores, cleared as a whole once full
+CACHE_SIZE = 200000
+
+_cache = {}
+
+
+def _digest(pubsub_topic, payload, content_topic, meta, timestamp):
+    ctx = hashlib.sha256()
+    ctx.update(pubsub_topic.encode("utf-8"))
+    ctx.update(base64.b64decode(payload))
+    ctx.update(content_topic.encode("utf-8"))
+    if meta is not None:
+        ctx.update(base64.b64decode(meta))
+    ctx.update(int(timestamp).to_bytes(8, byteorder="big"))
+    digest = ctx.digest()
+    # nwaku reports hashes as 0x prefixed hex, go-waku as base64
+    return MessageHash("0x" + digest.hex(), base64.b64encode(digest).decode("utf-8"))
+
+
+def message_hash(pubsub_topic, message):
+    # keyed by the hashed fields themselves, a message changed after hashing is hashed again
+    key = (pubsub_topic, message["payload"], message["contentTopic"], message.get("meta"), message["timestamp"])
+    cached = _cache.get(key)
+    if cached is None:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        cached = _cache[key] = _digest(*key)
+    return cached
+
+
+def message_hashes(pubsub_topic, messages, hash_type=None):
+    """
+    Hashes of `messages` in their order, each one sha256 giving both encodings. With `hash_type`
+    ("hex" or "base64") only that encoding is returned.
+    """
+    hashes = [message_hash(pubsub_topic, message) for message in messages]
+    if hash_type is None:
+        return hashes
+    if hash_type == "hex":
+        return [item.hex for item in hashes]
+    return [item.base64 for item in hashes]
@@ -0,0 +1,134 @@
+import functools
+import random
+import threading
+from time import monotonic, sleep
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+_budget_deadline = None
+_non_retryable = []
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def start_wait_budget(seconds):
+    """
+    Every wait started from now on gives up at the latest `seconds` from now, whatever its own timeout,
+    so a test spending its time in retries still fails with its own assertion and a clean teardown
+    instead of being killed by the pytest timeout.
+    """
+    global _budget_deadline
+    _budget_deadline = monotonic() + seconds if seconds else None
+
+
+def stop_wait_budget():
+    global _budget_deadline
+    _budget_deadline = None
+
+
+def remaining_wait_budget():
+    if _budget_deadline is None:
+        return None
+    return max(0.0, _budget_deadline - monotonic())
+
+
+def register_non_retryable(exception_type):
+    # errors that can't go away by waiting are raised on the first attempt
+    if exception_type not in _non_retryable:
+        _non_retryable.append(exception_type)
+
+
+class WaitSiteStats:
+    __slots__ = ("calls", "attempts", "successes", "failures", "budget_cut", "time_to_success", "max_time_to_success")
+
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.budget_cut = 0
+        self.time_to_success = 0.0
+        self.max_time_to_success = 0.0
+
+    def record(self, attempts, elapsed, success, budget_cut):
+        self.calls += 1
+        self.attempts += attempts
+        self.budget_cut += int(budget_cut)
+        if success:
+            self.successes += 1
+            self.time_to_success += elapsed
+            self.max_time_to_success = max(self.max_time_to_success, elapsed)
+        else:
+            self.failures += 1
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "budget_cut": self.budget_cut,
+            "mean_time_to_success_s": round(self.time_to_success / self.successes, 3) if self.successes else None,
+            "max_time_to_success_s": round(self.max_time_to_success, 3),
+        }
+
+
+def _record(site, attempts, elapsed, success, budget_cut):
+    with _stats_lock:
+        stats = _stats.get(site)
+        if stats is None:
+            stats = _stats[site] = WaitSiteStats()
+        stats.record(attempts, elapsed, success, budget_cut)
+
+
+def wait_stats():
+    with _stats_lock:
+        return {site: stats.summary() for site, stats in sorted(_stats.items())}
+
+
+def retry_with_backoff(timeout, max_wait=1, first_wait=0.1, factor=2, jitter=0.2, site=None):
+    """
+    Retries the decorated callable until it returns without raising, then returns its result; once
+    `timeout` seconds (or the wait budget of the test) are spent the last error is raised. The first
+    probes come fast, after `first_wait`, and the pause grows by `factor` up to `max_wait`, each one
+    shifted by up to `jitter` of itself so nodes polled together don't stay in lockstep.
+    """
+
+    def decorator(func):
+        name = site or f"{func.__module__}.{func.__qualname__.replace('.<locals>', '')}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = monotonic()
+            deadline = started + timeout
+            budget_cut = _budget_deadline is not None and _budget_deadline < deadline
+            if budget_cut:
+                deadline = _budget_deadline
+            pause = min(first_wait, max_wait)
+            attempts = 0
+            while True:
+                attempts += 1
+                try:
+                    result = func(*args, **kwargs)
+                except tuple(_non_retryable):
+                    _record(name, attempts, monotonic() - started, False, False)
+                    raise
+                except Exception as ex:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        _record(name, attempts, monotonic() - started, False, budget_cut)
+                        if budget_cut:
+                            logger.debug(f"{name} gave up after {attempts} attempts, the wait budget of the test is spent")
+                        raise
+                    if attempts == 1:
+                        logger.debug(f"{name} not there yet, retrying for up to {remaining:.1f}s: {ex}")
+                    sleep(min(pause * random.uniform(1 - jitter, 1 + jitter), remaining))
+                    pause = min(pause * factor, max_wait)
+                else:
+                    _record(name, attempts, monotonic() - started, True, False)
+                    return result
+
+        return wrapper
+
+    return decorator
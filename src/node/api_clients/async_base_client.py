@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+from time import perf_counter
+import aiohttp
+from src.env_vars import API_REQUEST_TIMEOUT
+from src.libs.custom_logger import get_custom_logger
+from src.node.api_clients.base_client import BaseClient, POOL_MAXSIZE
+
+logger = get_custom_logger(__name__)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    # one event loop per process, running on its own thread, owns every async HTTP session
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async_rest", daemon=True).start()
+    return _loop
+
+
+def run_async(coroutine):
+    loop = get_event_loop()
+    if threading.current_thread().name == "async_rest":
+        raise RuntimeError("run_async can't be called from the event loop thread, await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def gather(coroutines, return_exceptions=False):
+    """
+    Runs the coroutines concurrently and returns their results in the same order, so N calls
+    to N different nodes take about as long as the slowest of them.
+    """
+
+    async def gather_all():
+        return await asyncio.gather(*coroutines, return_exceptions=return_exceptions)
+
+    return run_async(gather_all())
+
+
+class RESTError(Exception):
+    # same message as the errors of the sync client, with the status code kept for bulk callers
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncResponse:
+    def __init__(self, status_code, reason, url, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.url = url
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncBaseClient(BaseClient):
+    def __init__(self, image=None, node=None):
+        super().__init__(image, node)
+        self._async_session = None
+        self._async_connections = 0
+
+    async def _checkout_async_session(self):
+        # only ever called on the event loop thread
+        if self._async_session is None:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=POOL_MAXSIZE),
+                timeout=aiohttp.ClientTimeout(total=float(API_REQUEST_TIMEOUT)),
+                trace_configs=[trace_config],
+            )
+        self._count_request()
+        return self._async_session
+
+    async def _on_connection_created(self, session, context, params):
+        self._async_connections += 1
+
+    def _open_connections(self):
+        return self._async_connections
+
+    def close(self):
+        session, self._async_session = self._async_session, None
+        if session is None:
+            return
+        run_async(session.close())
+        opened, self._async_connections = self._async_connections, 0
+        self._count_closed_connections(opened)
+        logger.debug(f"Async HTTP session closed after {self._requests_sent} requests over {self._connections_closed} connections")
+
+    async def make_request(self, method, url, headers=None, data=None):
+        if self.watchdog is not None:
+            self.watchdog.raise_if_crashed()
+        log_this = self.log_request_as_curl(method, url, headers, data)
+        session = await self._checkout_async_session()
+        started = perf_counter()
+        try:
+            async with session.request(method.upper(), url, headers=headers, data=data) as resp:
+                response = AsyncResponse(resp.status, resp.reason, url, await resp.read())
+        except Exception as ex:
+            self.record_latency(method, url, perf_counter() - started, error=True)
+            if self.watchdog is not None and isinstance(ex, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+                # no waiting for the event here, it would hold up the event loop
+                self.watchdog.raise_if_crashed()
+            raise
+        self.record_latency(method, url, perf_counter() - started, error=response.status_code >= 400)
+        if response.status_code >= 400:
+            kind = "Client" if response.status_code < 500 else "Server"
+            http_err = f"{response.status_code} {kind} Error: {response.reason} for url: {url}"
+            logger.error(f"HTTP error occurred: {http_err}. Response content: {response.content}")
+            raise RESTError(f"Error: {http_err} with response: {response.content}", response.status_code)
+        if log_this:
+            self.log_response(response)
+        return response
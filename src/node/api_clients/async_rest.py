@@ -0,0 +1,137 @@
+from src.libs.custom_logger import get_custom_logger
+import json
+from urllib.parse import quote
+from src.node.api_clients.async_base_client import AsyncBaseClient
+from src.node.api_clients.rest import store_messages_endpoint
+
+logger = get_custom_logger(__name__)
+
+
+class AsyncREST(AsyncBaseClient):
+    def __init__(self, rest_port, metrics_port=None, image=None):
+        super().__init__(image, f"{image}@{rest_port}" if image else str(rest_port))
+        self._rest_port = rest_port
+        self._metrics_port = metrics_port
+
+    async def rest_call(self, method, endpoint, payload=None):
+        url = f"http://127.0.0.1:{self._rest_port}/{endpoint}"
+        headers = {"Content-Type": "application/json"}
+        return await self.make_request(method, url, headers=headers, data=payload)
+
+    async def rest_call_text(self, method, endpoint, payload=None):
+        url = f"http://127.0.0.1:{self._rest_port}/{endpoint}"
+        headers = {"accept": "text/plain"}
+        return await self.make_request(method, url, headers=headers, data=payload)
+
+    async def info(self):
+        info_response = await self.rest_call("get", "debug/v1/info")
+        return info_response.json()
+
+    async def health(self):
+        health_response = await self.rest_call("get", "health")
+        return health_response.content
+
+    async def metrics(self):
+        return await self.make_request("get", f"http://127.0.0.1:{self._metrics_port}/metrics")
+
+    async def get_peers(self):
+        get_peers_response = await self.rest_call("get", "admin/v1/peers")
+        return get_peers_response.json()
+
+    async def add_peers(self, peers):
+        return await self.rest_call("post", "admin/v1/peers", json.dumps(peers))
+
+    async def set_relay_subscriptions(self, pubsub_topics):
+        return await self.rest_call("post", "relay/v1/subscriptions", json.dumps(pubsub_topics))
+
+    async def set_relay_auto_subscriptions(self, content_topics):
+        return await self.rest_call("post", "relay/v1/auto/subscriptions", json.dumps(content_topics))
+
+    async def delete_relay_subscriptions(self, pubsub_topics):
+        return await self.rest_call("delete", "relay/v1/subscriptions", json.dumps(pubsub_topics))
+
+    async def delete_relay_auto_subscriptions(self, content_topics):
+        return await self.rest_call("delete", "relay/v1/auto/subscriptions", json.dumps(content_topics))
+
+    async def send_relay_message(self, message, pubsub_topic):
+        return await self.rest_call("post", f"relay/v1/messages/{quote(pubsub_topic, safe='')}", json.dumps(message))
+
+    async def send_relay_auto_message(self, message):
+        return await self.rest_call("post", "relay/v1/auto/messages", json.dumps(message))
+
+    async def send_light_push_message(self, payload):
+        return await self.rest_call("post", "lightpush/v1/message", json.dumps(payload))
+
+    async def get_relay_messages(self, pubsub_topic):
+        get_messages_response = await self.rest_call("get", f"relay/v1/messages/{quote(pubsub_topic, safe='')}")
+        return get_messages_response.json()
+
+    async def get_relay_auto_messages(self, content_topic):
+        get_messages_response = await self.rest_call("get", f"relay/v1/auto/messages/{quote(content_topic, safe='')}")
+        return get_messages_response.json()
+
+    async def set_filter_subscriptions(self, subscription):
+        set_subscriptions_response = await self.rest_call("post", "filter/v2/subscriptions", json.dumps(subscription))
+        return set_subscriptions_response.json()
+
+    async def update_filter_subscriptions(self, subscription):
+        update_subscriptions_response = await self.rest_call("put", "filter/v2/subscriptions", json.dumps(subscription))
+        return update_subscriptions_response.json()
+
+    async def delete_filter_subscriptions(self, subscription):
+        delete_subscriptions_response = await self.rest_call("delete", "filter/v2/subscriptions", json.dumps(subscription))
+        return delete_subscriptions_response.json()
+
+    async def delete_all_filter_subscriptions(self, request_id):
+        delete_all_subscriptions_response = await self.rest_call("delete", "filter/v2/subscriptions/all", json.dumps(request_id))
+        return delete_all_subscriptions_response.json()
+
+    async def ping_filter_subscriptions(self, request_id):
+        ping_subscriptions_response = await self.rest_call("get", f"filter/v2/subscriptions/{quote(request_id, safe='')}")
+        return ping_subscriptions_response.json()
+
+    async def get_filter_messages(self, content_topic, pubsub_topic=None):
+        if pubsub_topic is not None:
+            endpoint = f"filter/v2/messages/{quote(pubsub_topic, safe='')}/{quote(content_topic, safe='')}"
+        else:
+            endpoint = f"filter/v2/messages/{quote(content_topic, safe='')}"
+        get_messages_response = await self.rest_call("get", endpoint)
+        return get_messages_response.json()
+
+    async def get_store_messages(
+        self,
+        peer_addr,
+        include_data,
+        pubsub_topic,
+        content_topics,
+        start_time,
+        end_time,
+        hashes,
+        cursor,
+        page_size,
+        ascending,
+        store_v,
+        encode_pubsubtopic=True,
+        raw_response=False,
+        **kwargs,
+    ):
+        endpoint = store_messages_endpoint(
+            peer_addr,
+            include_data,
+            pubsub_topic,
+            content_topics,
+            start_time,
+            end_time,
+            hashes,
+            cursor,
+            page_size,
+            ascending,
+            store_v,
+            encode_pubsubtopic,
+            **kwargs,
+        )
+        get_messages_response = await self.rest_call("get", endpoint)
+        # the store pager wants the size of the page on the wire as well
+        if raw_response:
+            return get_messages_response
+        return get_messages_response.json()
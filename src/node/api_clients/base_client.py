@@ -1,15 +1,143 @@
+import itertools
 import json
+import logging
+import threading
+import weakref
+from time import perf_counter
 import requests
-from src.env_vars import API_REQUEST_TIMEOUT
+from requests.adapters import HTTPAdapter
+from src.env_vars import API_REQUEST_TIMEOUT, REST_LOG_MODE, REST_LOG_SAMPLE_RATE, REST_LOG_MAX_CHARS
 from src.libs.custom_logger import get_custom_logger
+from src.node.api_clients.latency import get_latency_recorder
 
 logger = get_custom_logger(__name__)
 
+# keep-alive connections kept per node, enough for the concurrent publishers and pollers of one test
+POOL_MAXSIZE = 32
+# how long a broken connection waits for the docker event telling whether the node crashed
+CRASH_EVENT_GRACE = 0.2
+
+_clients = weakref.WeakSet()
+# requests of all clients, connections of the sessions that were closed already
+_totals = {"requests": 0, "connections": 0}
+_totals_lock = threading.Lock()
+
+
+REST_LOG_MODES = ["off", "sampled", "truncated", "full"]
+if REST_LOG_MODE not in REST_LOG_MODES:
+    raise ValueError(f"REST_LOG_MODE must be one of {REST_LOG_MODES}, got {REST_LOG_MODE}")
+
+_request_counter = itertools.count()
+# how many request/response pairs were logged or skipped and the time spent building and emitting them
+_log_cost = {"logged": 0, "skipped": 0, "seconds": 0.0}
+_log_cost_lock = threading.Lock()
+
+
+def request_log_stats():
+    with _log_cost_lock:
+        return dict(_log_cost)
+
+
+def _count_log_cost(logged, seconds=0.0):
+    with _log_cost_lock:
+        _log_cost["logged" if logged else "skipped"] += 1
+        _log_cost["seconds"] += seconds
+
+
+def truncate_for_log(text):
+    max_chars = int(REST_LOG_MAX_CHARS)
+    if REST_LOG_MODE != "truncated" or text is None or len(text) <= max_chars:
+        return text
+    # bytes are cut as characters, slicing them would split multi-byte characters and log a bytes repr
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", errors="replace")
+        if len(text) <= max_chars:
+            return text
+    return f"{text[:max_chars]}...({len(text) - max_chars} more)"
+
+
+def http_stats():
+    # requests sent vs TCP connections opened by all clients of this process
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["connections"] += sum(client._open_connections() for client in list(_clients))
+    return totals
+
 
 class BaseClient:
+    """
+    Every client keeps one requests Session, so consecutive calls to the same node reuse their
+    keep-alive connections instead of paying a TCP handshake each.
+    """
+
+    def __init__(self, image=None, node=None):
+        # image and node label the latency histograms of this client
+        self._image = image
+        self._node = node
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._requests_sent = 0
+        self._connections_closed = 0
+        # set by the node once it runs, lets calls fail fast when its container is gone
+        self.watchdog = None
+        _clients.add(self)
+
+    def _checkout_session(self):
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            session = self._session
+        self._count_request()
+        return session
+
+    def _count_request(self):
+        with self._session_lock:
+            self._requests_sent += 1
+        with _totals_lock:
+            _totals["requests"] += 1
+
+    def _count_closed_connections(self, opened):
+        self._connections_closed += opened
+        with _totals_lock:
+            _totals["connections"] += opened
+
+    def stats(self):
+        return {"requests": self._requests_sent, "connections": self._connections_closed + self._open_connections()}
+
+    def _open_connections(self):
+        session = self._session
+        if session is None:
+            return 0
+        pools = session.get_adapter("http://").poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def close(self):
+        with self._session_lock:
+            if self._session is None:
+                return
+            opened = self._open_connections()
+            self._session.close()
+            self._session = None
+        self._count_closed_connections(opened)
+        logger.debug(f"HTTP session closed after {self._requests_sent} requests over {self._connections_closed} connections")
+
     def make_request(self, method, url, headers=None, data=None):
-        self.log_request_as_curl(method, url, headers, data)
-        response = requests.request(method.upper(), url, headers=headers, data=data, timeout=API_REQUEST_TIMEOUT)
+        if self.watchdog is not None:
+            self.watchdog.raise_if_crashed()
+        log_this = self.log_request_as_curl(method, url, headers, data)
+        started = perf_counter()
+        try:
+            response = self._checkout_session().request(method.upper(), url, headers=headers, data=data, timeout=API_REQUEST_TIMEOUT)
+        except Exception as ex:
+            self.record_latency(method, url, perf_counter() - started, error=True)
+            if self.watchdog is not None and isinstance(ex, (requests.ConnectionError, requests.Timeout)):
+                self.watchdog.raise_if_crashed(wait=CRASH_EVENT_GRACE)
+            raise
+        self.record_latency(method, url, perf_counter() - started, error=not response.ok)
         try:
             response.raise_for_status()
         except requests.HTTPError as http_err:
@@ -19,11 +147,35 @@ class BaseClient:
             logger.error(f"An error occurred: {err}. Response content: {response.content}")
             raise Exception(f"Error: {err} with response: {response.content}")
         else:
-            logger.info(f"Response status code: {response.status_code}. Response content: {response.content}")
+            if log_this:
+                self.log_response(response)
         return response
 
+    def record_latency(self, method, url, seconds, error=False):
+        get_latency_recorder().record(self._image, self._node, method, url, seconds, error)
+
+    def should_log_request(self):
+        if REST_LOG_MODE == "off" or not logger.isEnabledFor(logging.INFO):
+            return False
+        if REST_LOG_MODE == "sampled":
+            return next(_request_counter) % int(REST_LOG_SAMPLE_RATE) == 0
+        return True
+
+    def log_response(self, response):
+        started = perf_counter()
+        logger.info(f"Response status code: {response.status_code}. Response content: {truncate_for_log(response.content)}")
+        with _log_cost_lock:
+            _log_cost["seconds"] += perf_counter() - started
+
     def log_request_as_curl(self, method, url, headers, data):
-        if data:
+        # the curl command is only built for requests that are going to be logged, returns whether it was
+        if not self.should_log_request():
+            _count_log_cost(False)
+            return False
+        started = perf_counter()
+        logged_data = truncate_for_log(data)
+        # a cut body is no valid JSON anymore, it is logged as it is
+        if data and logged_data is data:
             try:
                 data_dict = json.loads(data)
                 if "timestamp" in data_dict:
@@ -32,6 +184,10 @@ class BaseClient:
                 data = data.replace('"TIMESTAMP_PLACEHOLDER"', "'$(date +%s%N)'")
             except json.JSONDecodeError:
                 logger.error("Invalid JSON data provided")
+        else:
+            data = logged_data
         headers_str_for_log = " ".join([f'-H "{key}: {value}"' for key, value in headers.items()]) if headers else ""
         curl_cmd = f"curl -v -X {method.upper()} \"{url}\" {headers_str_for_log} -d '{data}'"
         logger.info(curl_cmd)
+        _count_log_cost(True, perf_counter() - started)
+        return True
@@ -0,0 +1,144 @@
+import json
+import math
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+# buckets grow by 5%, so percentiles are exact to within 5% from 10 microseconds up to minutes
+BUCKET_GROWTH = 1.05
+MIN_LATENCY = 0.00001
+
+# path segments that carry topics or ids, folded so every call of an endpoint lands in one histogram
+ENDPOINT_TEMPLATES = [
+    (re.compile(r"^relay/v1/messages/[^/]+$"), "relay/v1/messages/{pubsubTopic}"),
+    (re.compile(r"^relay/v1/auto/messages/[^/]+$"), "relay/v1/auto/messages/{contentTopic}"),
+    (re.compile(r"^filter/v2/messages/[^/]+/[^/]+$"), "filter/v2/messages/{pubsubTopic}/{contentTopic}"),
+    (re.compile(r"^filter/v2/messages/[^/]+$"), "filter/v2/messages/{contentTopic}"),
+    (re.compile(r"^filter/v2/subscriptions/(?!all$)[^/]+$"), "filter/v2/subscriptions/{requestId}"),
+]
+
+
+def endpoint_template(url):
+    path = urlsplit(url).path.lstrip("/")
+    for pattern, template in ENDPOINT_TEMPLATES:
+        if pattern.match(path):
+            return template
+    return path
+
+
+def report_order(item):
+    # clients without an image have None in their key
+    return [str(part) for part in item[0]]
+
+
+class LatencyHistogram:
+    __slots__ = ("buckets", "count", "errors", "max", "total")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.errors = 0
+        self.max = 0.0
+        self.total = 0.0
+
+    def record(self, seconds, error=False):
+        bucket = int(math.log(max(seconds, MIN_LATENCY) / MIN_LATENCY, BUCKET_GROWTH))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.errors += int(error)
+        self.max = max(self.max, seconds)
+        self.total += seconds
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.errors += other.errors
+        self.max = max(self.max, other.max)
+        self.total += other.total
+
+    def percentile(self, fraction):
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # upper bound of the bucket, never above the largest value actually seen
+                return min(MIN_LATENCY * BUCKET_GROWTH ** (bucket + 1), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p90_ms": round(self.percentile(0.9) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class LatencyRecorder:
+    """
+    REST latency per node and endpoint, kept twice: for the running test and for the whole session.
+    Histograms are keyed by (image, node, "METHOD endpoint"); the session report folds nodes of the
+    same image together since ports mean nothing across tests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._test = {}
+        self._session = {}
+
+    def record(self, image, node, method, url, seconds, error=False):
+        key = (image, node, f"{method.upper()} {endpoint_template(url)}")
+        with self._lock:
+            for histograms in (self._test, self._session):
+                histogram = histograms.get(key)
+                if histogram is None:
+                    histogram = histograms[key] = LatencyHistogram()
+                histogram.record(seconds, error)
+
+    def start_test(self):
+        with self._lock:
+            self._test = {}
+
+    def test_report(self):
+        with self._lock:
+            histograms = dict(self._test)
+        return [
+            {"image": image, "node": node, "endpoint": endpoint, **histogram.summary()}
+            for (image, node, endpoint), histogram in sorted(histograms.items(), key=report_order)
+        ]
+
+    def session_report(self):
+        by_image = {}
+        with self._lock:
+            for (image, _, endpoint), histogram in self._session.items():
+                by_image.setdefault((image, endpoint), LatencyHistogram()).merge(histogram)
+        return [
+            {"image": image, "endpoint": endpoint, **histogram.summary()}
+            for (image, endpoint), histogram in sorted(by_image.items(), key=report_order)
+        ]
+
+
+def write_latency_report(report, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = json.dumps(report, indent=2)
+    with open(path, "w") as f:
+        f.write(content)
+    return content
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_latency_recorder():
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = LatencyRecorder()
+    return _recorder
@@ -6,8 +6,61 @@ from src.node.api_clients.base_client import BaseClient
 logger = get_custom_logger(__name__)
 
 
+def store_messages_endpoint(
+    peer_addr,
+    include_data,
+    pubsub_topic,
+    content_topics,
+    start_time,
+    end_time,
+    hashes,
+    cursor,
+    page_size,
+    ascending,
+    store_v,
+    encode_pubsubtopic=True,
+    **kwargs,
+):
+    base_url = f"store/{store_v}/messages"
+    params = []
+
+    if peer_addr is not None:
+        params.append(f"peerAddr={quote(peer_addr, safe='')}")
+    if include_data is not None:
+        params.append(f"includeData={include_data}")
+    if pubsub_topic is not None:
+        if encode_pubsubtopic:
+            params.append(f"pubsubTopic={quote(pubsub_topic, safe='')}")
+        else:
+            params.append(f"pubsubTopic={pubsub_topic}")
+    if content_topics is not None:
+        params.append(f"contentTopics={quote(content_topics, safe='')}")
+    if start_time is not None:
+        params.append(f"startTime={start_time}")
+    if end_time is not None:
+        params.append(f"endTime={end_time}")
+    if hashes is not None:
+        params.append(f"hashes={quote(hashes, safe='')}")
+    if cursor is not None:
+        params.append(f"cursor={quote(cursor, safe='')}")
+    if page_size is not None:
+        params.append(f"pageSize={page_size}")
+    if ascending is not None:
+        params.append(f"ascending={ascending}")
+
+    # Append any additional keyword arguments to the parameters list
+    for key, value in kwargs.items():
+        if value is not None:
+            params.append(f"{key}={quote(str(value), safe='')}")
+
+    if params:
+        base_url += "?" + "&".join(params)
+    return base_url
+
+
 class REST(BaseClient):
-    def __init__(self, rest_port):
+    def __init__(self, rest_port, image=None):
+        super().__init__(image, f"{image}@{rest_port}" if image else str(rest_port))
         self._rest_port = rest_port
 
     def rest_call(self, method, endpoint, payload=None):
@@ -108,40 +161,20 @@ class REST(BaseClient):
         encode_pubsubtopic=True,
         **kwargs,
     ):
-        base_url = f"store/{store_v}/messages"
-        params = []
-
-        if peer_addr is not None:
-            params.append(f"peerAddr={quote(peer_addr, safe='')}")
-        if include_data is not None:
-            params.append(f"includeData={include_data}")
-        if pubsub_topic is not None:
-            if encode_pubsubtopic:
-                params.append(f"pubsubTopic={quote(pubsub_topic, safe='')}")
-            else:
-                params.append(f"pubsubTopic={pubsub_topic}")
-        if content_topics is not None:
-            params.append(f"contentTopics={quote(content_topics, safe='')}")
-        if start_time is not None:
-            params.append(f"startTime={start_time}")
-        if end_time is not None:
-            params.append(f"endTime={end_time}")
-        if hashes is not None:
-            params.append(f"hashes={quote(hashes, safe='')}")
-        if cursor is not None:
-            params.append(f"cursor={quote(cursor, safe='')}")
-        if page_size is not None:
-            params.append(f"pageSize={page_size}")
-        if ascending is not None:
-            params.append(f"ascending={ascending}")
-
-        # Append any additional keyword arguments to the parameters list
-        for key, value in kwargs.items():
-            if value is not None:
-                params.append(f"{key}={quote(str(value), safe='')}")
-
-        if params:
-            base_url += "?" + "&".join(params)
-
-        get_messages_response = self.rest_call("get", base_url)
+        endpoint = store_messages_endpoint(
+            peer_addr,
+            include_data,
+            pubsub_topic,
+            content_topics,
+            start_time,
+            end_time,
+            hashes,
+            cursor,
+            page_size,
+            ascending,
+            store_v,
+            encode_pubsubtopic,
+            **kwargs,
+        )
+        get_messages_response = self.rest_call("get", endpoint)
         return get_messages_response.json()
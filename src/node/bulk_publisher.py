@@ -0,0 +1,64 @@
+import asyncio
+from collections import namedtuple
+from time import time
+from src.libs.custom_logger import get_custom_logger
+from src.node.api_clients.async_base_client import RESTError
+
+logger = get_custom_logger(__name__)
+
+PUBLISH_VIA = ["relay", "auto", "lightpush"]
+
+PublishResult = namedtuple("PublishResult", ["index", "message", "sent_at", "duration", "status_code", "error"])
+
+
+def publish_summary(results):
+    failed = [result for result in results if result.error is not None]
+    if not results:
+        return "no messages published"
+    elapsed = max(result.sent_at + result.duration for result in results) - min(result.sent_at for result in results)
+    return f"{len(results) - len(failed)}/{len(results)} messages accepted in {elapsed:.2f}s, {len(failed)} failed"
+
+
+async def publish_messages(node, messages, via="relay", pubsub_topic=None, concurrency=16, rate=None, ordered=False):
+    """
+    Publishes `messages` through `node` with up to `concurrency` requests in flight over its pooled
+    connections, started no faster than `rate` messages per second when given. With `ordered` every
+    message is acknowledged by the node before the next one is sent. Failures don't stop the run,
+    they end up in the result of their message; results come back in the order of `messages`.
+    """
+    if via not in PUBLISH_VIA:
+        raise ValueError(f"Can't publish via {via}, expected one of {PUBLISH_VIA}")
+    if via in ["relay", "lightpush"] and pubsub_topic is None:
+        raise ValueError(f"Publishing via {via} needs a pubsub topic")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def send(message):
+        if via == "relay":
+            return await node.send_relay_message_async(message, pubsub_topic)
+        if via == "auto":
+            return await node.send_relay_auto_message_async(message)
+        return await node.send_light_push_message_async({"pubsubTopic": pubsub_topic, "message": message})
+
+    async def publish(index, message):
+        if rate:
+            await asyncio.sleep(max(0, started + index / rate - loop.time()))
+        async with semaphore:
+            sent_at = time()
+            try:
+                response = await send(message)
+                status_code, error = response.status_code, None
+            except RESTError as ex:
+                status_code, error = ex.status_code, str(ex)
+            except Exception as ex:
+                status_code, error = None, str(ex)
+            return PublishResult(index, message, sent_at, time() - sent_at, status_code, error)
+
+    if ordered:
+        results = [await publish(index, message) for index, message in enumerate(messages)]
+    else:
+        results = await asyncio.gather(*(publish(index, message) for index, message in enumerate(messages)))
+    logger.debug(f"Publishing via {via} through {node.image}: {publish_summary(results)}")
+    return results
@@ -0,0 +1,120 @@
+import os
+import threading
+from contextlib import contextmanager
+from time import time
+from src.libs.custom_logger import get_custom_logger
+from src.libs.retrying import register_non_retryable
+from src.node.docker_events import get_docker_event_bus
+from src.node.log_collector import flush_container_logs
+
+logger = get_custom_logger(__name__)
+
+LOG_TAIL_LINES = 30
+# docker stamps its events itself, a deliberate restart may be reported slightly after it returned
+EXPECTED_EXIT_SLACK = 0.5
+
+
+class NodeCrashed(Exception):
+    def __init__(self, message, exit_code=None, log_tail=""):
+        super().__init__(message)
+        self.exit_code = exit_code
+        self.log_tail = log_tail
+
+
+# a dead node stays dead, waiting for it only burns the time budget of the test
+register_non_retryable(NodeCrashed)
+
+
+def read_log_tail(log_path, lines=LOG_TAIL_LINES):
+    flush_container_logs(log_path)
+    try:
+        with open(log_path, "rb") as log_file:
+            log_file.seek(max(0, os.path.getsize(log_path) - 64 * 1024))
+            tail = log_file.read().decode("utf-8", errors="replace").splitlines()
+    except FileNotFoundError:
+        return ""
+    return "\n".join(tail[-lines:])
+
+
+class CrashWatchdog:
+    """
+    Follows the docker events of one running node. Once its container exits, runs out of memory or gets
+    killed by anything but the node's own stop/kill/restart, calls to the node raise NodeCrashed with the
+    exit code and the end of its log instead of running into REST timeouts. Starting the container again
+    clears the state.
+    """
+
+    def __init__(self, container, name, log_path):
+        self._container_id = container.id
+        self._name = name
+        self._log_path = log_path
+        self._lock = threading.Lock()
+        self._crashed = threading.Event()
+        self._expecting_since = None
+        self._expected_windows = []
+        self.reason = None
+        self.exit_code = None
+
+    def watch(self):
+        get_docker_event_bus().subscribe(self._container_id, self.on_docker_event)
+
+    def unwatch(self):
+        get_docker_event_bus().unsubscribe(self._container_id, self.on_docker_event)
+
+    @property
+    def crashed(self):
+        return self._crashed.is_set()
+
+    @contextmanager
+    def expected_exit(self):
+        with self._lock:
+            self._expecting_since = time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._expected_windows.append((self._expecting_since, time() + EXPECTED_EXIT_SLACK))
+                self._expecting_since = None
+
+    def _is_expected(self, moment):
+        if self._expecting_since is not None and moment >= self._expecting_since:
+            return True
+        return any(since <= moment <= until for since, until in self._expected_windows)
+
+    def on_docker_event(self, event):
+        status = event.get("status") or event.get("Action", "")
+        if status not in ["die", "oom", "kill", "start"]:
+            return
+        attributes = event.get("Actor", {}).get("Attributes", {})
+        with self._lock:
+            if self._is_expected(event.get("timeNano", time() * 1e9) / 1e9):
+                return
+            if status == "start":
+                if self._crashed.is_set():
+                    logger.info(f"Container of {self._name} started again after it {self.reason}")
+                self._crashed.clear()
+                self.reason = None
+                self.exit_code = None
+                return
+            if status == "die":
+                self.exit_code = attributes.get("exitCode")
+                self.reason = self.reason or f"exited with code {self.exit_code}"
+            elif status == "oom":
+                self.reason = "ran out of memory"
+            else:
+                self.reason = f"was killed with signal {attributes.get('signal')}"
+            newly_crashed = not self._crashed.is_set()
+            self._crashed.set()
+        if newly_crashed:
+            logger.error(f"Container of {self._name} {self.reason}, calls to it fail from now on")
+
+    def raise_if_crashed(self, wait=0):
+        # `wait` gives the event of a crash that just broke a connection the time to arrive
+        crashed = self._crashed.wait(wait) if wait else self._crashed.is_set()
+        if crashed:
+            log_tail = read_log_tail(self._log_path)
+            raise NodeCrashed(
+                f"Node {self._name} {self.reason} (exit code {self.exit_code}), last log lines:\n{log_tail}",
+                exit_code=self.exit_code,
+                log_tail=log_tail,
+            )
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import defaultdict
+import docker
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+
+class DockerEventBus:
+    """
+    Single docker events stream shared by everything that wants to react to container state changes
+    (start up readiness, exits). Callbacks run on the event thread and must stay cheap.
+    """
+
+    def __init__(self):
+        self._client = docker.from_env()
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, container_id, callback):
+        with self._lock:
+            self._subscribers[container_id].append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="docker_events", daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, container_id, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(container_id, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscribers.pop(container_id, None)
+
+    def _run(self):
+        while True:
+            try:
+                for event in self._client.events(decode=True, filters={"type": "container"}):
+                    self._dispatch(event)
+            except Exception as ex:
+                logger.warning(f"Docker event stream interrupted: {ex}, reconnecting")
+                time.sleep(0.5)
+
+    def _dispatch(self, event):
+        container_id = event.get("id") or event.get("Actor", {}).get("ID")
+        with self._lock:
+            callbacks = list(self._subscribers.get(container_id, []))
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as ex:
+                logger.error(f"Docker event callback failed for container {container_id[:12]}: {ex}")
+
+
+_event_bus = None
+_event_bus_lock = threading.Lock()
+
+
+def get_docker_event_bus():
+    global _event_bus
+    with _event_bus_lock:
+        if _event_bus is None:
+            _event_bus = DockerEventBus()
+    return _event_bus
@@ -1,16 +1,20 @@
-import os
-import re
-import time
-from src.libs.custom_logger import get_custom_logger
-import random
 import threading
+from src.libs.custom_logger import get_custom_logger
 import docker
 from src.env_vars import NETWORK_NAME, SUBNET, IP_RANGE, GATEWAY
+from src.node.image_cache import get_image_cache
+from src.node.log_collector import flush_container_logs, get_log_collector
+from src.node.log_scanner import get_log_scanner
+from src.node.resource_allocator import get_resource_allocator
 from docker.types import IPAMConfig, IPAMPool
-from docker.errors import NotFound, APIError
+from docker.errors import APIError, NotFound
 
 logger = get_custom_logger(__name__)
 
+# network name -> handle, looked up or created once per process
+_networks = {}
+_networks_lock = threading.Lock()
+
 
 class DockerManager:
     def __init__(self, image):
@@ -19,21 +23,44 @@ class DockerManager:
         logger.debug(f"Docker client initialized with image {self._image}")
 
     def create_network(self, network_name=NETWORK_NAME):
+        with _networks_lock:
+            network = _networks.get(network_name)
+            if network is None:
+                network = _networks[network_name] = self._find_or_create_network(network_name)
+            return network
+
+    @staticmethod
+    def forget_network(network_name=NETWORK_NAME):
+        with _networks_lock:
+            _networks.pop(network_name, None)
+
+    def _find_or_create_network(self, network_name):
         logger.debug(f"Attempting to create or retrieve network {network_name}")
         networks = self._client.networks.list(names=[network_name])
-        if networks:
-            logger.debug(f"Network {network_name} already exists")
-            return networks[0]
-
-        network = self._client.networks.create(
-            network_name,
-            driver="bridge",
-            ipam=IPAMConfig(driver="default", pool_configs=[IPAMPool(subnet=SUBNET, iprange=IP_RANGE, gateway=GATEWAY)]),
-        )
-        logger.debug(f"Network {network_name} created")
+        if not networks:
+            try:
+                network = self._client.networks.create(
+                    network_name,
+                    driver="bridge",
+                    ipam=IPAMConfig(driver="default", pool_configs=[IPAMPool(subnet=SUBNET, iprange=IP_RANGE, gateway=GATEWAY)]),
+                )
+                logger.debug(f"Network {network_name} created")
+                return network
+            except APIError as ex:
+                # another xdist worker was faster
+                logger.debug(f"Network {network_name} could not be created: {ex}")
+                networks = self._client.networks.list(names=[network_name])
+                if not networks:
+                    raise
+
+        network = networks[0]
+        subnets = [config.get("Subnet") for config in (network.attrs.get("IPAM") or {}).get("Config") or []]
+        if SUBNET not in subnets:
+            logger.warning(f"Network {network_name} uses subnets {subnets} instead of {SUBNET}, static IPs may be rejected")
+        logger.debug(f"Network {network_name} already exists")
         return network
 
-    def start_container(self, image_name, ports, args, log_path, container_ip, volumes, remove_container=True):
+    def start_container(self, image_name, ports, args, log_path, container_ip, volumes, remove_container=True, log_listeners=None):
         cli_args = []
         for key, value in args.items():
             if isinstance(value, list):  # Check if value is a list
@@ -46,68 +73,59 @@ class DockerManager:
         port_bindings = {f"{port}/tcp": ("", port) for port in ports}
         port_bindings_for_log = " ".join(f"-p {port}:{port}" for port in ports)
         cli_args_str_for_log = " ".join(cli_args)
-        logger.debug(f"docker run -i -t {port_bindings_for_log} {image_name} {cli_args_str_for_log}")
-        container = self._client.containers.run(
-            image_name, command=cli_args, ports=port_bindings, detach=True, remove=remove_container, auto_remove=remove_container, volumes=volumes
-        )
-
-        network = self._client.networks.get(NETWORK_NAME)
-        logger.debug(f"docker network connect --ip {container_ip} {NETWORK_NAME} {container.id}")
-        network.connect(container, ipv4_address=container_ip)
+        logger.debug(f"docker run -i -t --network {NETWORK_NAME} --ip {container_ip} {port_bindings_for_log} {image_name} {cli_args_str_for_log}")
+        try:
+            container = self._run_on_network(image_name, cli_args, port_bindings, container_ip, volumes, remove_container)
+        except NotFound as ex:
+            if "network" not in str(ex):
+                raise
+            logger.debug(f"Network {NETWORK_NAME} disappeared, creating it again")
+            self.forget_network()
+            container = self._run_on_network(image_name, cli_args, port_bindings, container_ip, volumes, remove_container)
 
         logger.debug(f"Container started with ID {container.short_id}. Setting up logs at {log_path}")
-        log_thread = threading.Thread(target=self._log_container_output, args=(container, log_path))
-        log_thread.daemon = True
-        log_thread.start()
+        get_log_collector().add(container, log_path, log_listeners)
 
         return container
 
-    def _log_container_output(self, container, log_path):
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
-        retry_count = 0
-        start_time = time.time()
-        try:
-            with open(log_path, "wb+") as log_file:
-                while True:
-                    if container.status in ["exited", "dead"]:
-                        logger.info(f"Container {container.short_id} has stopped. Exiting log stream.")
-                        return
-                    try:
-                        for chunk in container.logs(stream=True):
-                            if chunk:
-                                log_file.write(chunk)
-                                log_file.flush()
-                                start_time = time.time()
-                                retry_count = 0
-                            else:
-                                if time.time() - start_time > 5:
-                                    logger.warning(f"Log stream timeout for container {container.short_id}")
-                                    return
-                    except (APIError, IOError) as e:
-                        retry_count += 1
-                        if retry_count >= 5:
-                            logger.error(f"Max retries reached for container {container.short_id}. Exiting log stream.")
-                            return
-                        time.sleep(0.2)
-                    except Exception as e:
-                        return
-        except Exception as e:
-            logger.error(f"Failed to set up logging for container {container.short_id}: {e}")
+    def _run_on_network(self, image_name, cli_args, port_bindings, container_ip, volumes, remove_container):
+        # the container gets its static IP at creation time instead of being connected after it already runs
+        network = self.create_network()
+        endpoint_config = self._client.api.create_endpoint_config(ipv4_address=container_ip)
+        return self._client.containers.run(
+            get_image_cache().pinned(image_name),
+            command=cli_args,
+            ports=port_bindings,
+            detach=True,
+            remove=remove_container,
+            auto_remove=remove_container,
+            volumes=volumes,
+            network=network.name,
+            networking_config={network.name: endpoint_config},
+        )
 
     def generate_ports(self, base_port=None, count=5):
         if base_port is None:
-            base_port = random.randint(1024, 65535 - count)
-        ports = [str(base_port + i) for i in range(count)]
+            ports = get_resource_allocator().lease_ports(count)
+        else:
+            ports = [str(base_port + i) for i in range(count)]
         logger.debug(f"Generated ports {ports}")
         return ports
 
     @staticmethod
     def generate_random_ext_ip():
-        base_ip_fragments = ["172", "18"]
-        ext_ip = ".".join(base_ip_fragments + [str(random.randint(0, 255)) for _ in range(2)])
-        logger.debug(f"Generated random external IP {ext_ip}")
+        ext_ip = get_resource_allocator().lease_ip()
+        logger.debug(f"Generated external IP {ext_ip}")
         return ext_ip
 
+    @staticmethod
+    def release_ports_and_ip(ports, ext_ip):
+        allocator = get_resource_allocator()
+        if ports:
+            allocator.release_ports(ports)
+        if ext_ip:
+            allocator.release_ip(ext_ip)
+
     def is_container_running(self, container):
         try:
             refreshed_container = self._client.containers.get(container.id)
@@ -120,25 +138,15 @@ class DockerManager:
     def image(self):
         return self._image
 
-    def search_log_for_keywords(self, log_path, keywords, use_regex=False):
-        matches = {keyword: [] for keyword in keywords}
-
-        # Open the log file and search line by line
-        with open(log_path, "r") as log_file:
-            for line in log_file:
-                for keyword in keywords:
-                    if use_regex:
-                        if re.search(keyword, line, re.IGNORECASE):
-                            matches[keyword].append(line.strip())
-                    else:
-                        if keyword.lower() in line.lower():
-                            matches[keyword].append(line.strip())
+    def search_log_for_keywords(self, log_path, keywords, use_regex=False, max_lines=None):
+        flush_container_logs(log_path)
+        matches = get_log_scanner(log_path).search(keywords, use_regex, max_lines)
 
         # Check if there were any matches
-        if any(matches[keyword] for keyword in keywords):
+        if any(matches.values()):
             for keyword, lines in matches.items():
                 if lines:
-                    logger.debug(f"Found matches for keyword '{keyword}': {lines}")
+                    logger.debug(f"Found {matches.counts[keyword]} matches for keyword '{keyword}', lines: {lines}")
             return matches
         else:
             logger.debug("No errors found in the waku logs.")
@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+import docker
+from docker.errors import ImageNotFound
+from filelock import FileLock
+from src.env_vars import NODE_1, NODE_2, ADDITIONAL_NODES, DEFAULT_NWAKU
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+
+def configured_images():
+    # postgres is only needed by the tests using start_postgres_container, start_postgres pins it on first use
+    images = [NODE_1, NODE_2, DEFAULT_NWAKU]
+    if ADDITIONAL_NODES:
+        images.extend(node.strip() for node in ADDITIONAL_NODES.split(","))
+    return list(dict.fromkeys(image for image in images if image))
+
+
+class ImageCache:
+    """
+    Resolves image tags to image ids once per session. The first xdist worker that takes the file lock
+    pulls and inspects the images and writes the result to a file shared by the run, the other workers
+    just read it. Containers are then started from the pinned id, so tests never wait on the registry
+    and all workers run exactly the same image even when a tag moves during the run.
+    """
+
+    def __init__(self):
+        self._client = docker.from_env()
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def resolve_all(self, images, shared_file=None):
+        with self._lock:
+            if shared_file is None:
+                self._resolve_missing(images)
+            else:
+                self._resolve_shared(images, shared_file)
+        return self.resolved()
+
+    def _resolve_shared(self, images, shared_file):
+        with FileLock(f"{shared_file}.lock"):
+            if os.path.isfile(shared_file):
+                with open(shared_file) as f:
+                    self._images.update(json.load(f))
+            missing = [image for image in images if image not in self._images]
+            if missing:
+                self._resolve_missing(missing)
+                with open(shared_file, "w") as f:
+                    json.dump(self._images, f)
+
+    def pinned(self, image):
+        # images nobody resolved up front (scripts, ad hoc tests) are resolved on first use
+        with self._lock:
+            if image not in self._images:
+                self._resolve_missing([image])
+            return self._images[image]["id"]
+
+    def metadata(self, image):
+        return self._images.get(image)
+
+    def resolved(self):
+        return dict(self._images)
+
+    def _resolve_missing(self, images):
+        for image in images:
+            if image in self._images:
+                continue
+            try:
+                docker_image = self._client.images.get(image)
+            except ImageNotFound:
+                logger.debug(f"Image {image} not available locally, pulling it")
+                docker_image = self._client.images.pull(image)
+            self._images[image] = {
+                "id": docker_image.id,
+                "digest": (docker_image.attrs.get("RepoDigests") or [None])[0],
+                "created": docker_image.attrs.get("Created"),
+                "size": docker_image.attrs.get("Size"),
+            }
+            logger.info(f"Image {image} resolved to {self._images[image]['digest'] or docker_image.id}")
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageCache()
+    return _image_cache
@@ -0,0 +1,321 @@
+import atexit
+import os
+import selectors
+import socket
+import struct
+import threading
+from datetime import datetime
+from time import time
+import docker
+from src.libs.custom_logger import get_custom_logger
+from src.node.docker_events import get_docker_event_bus
+
+logger = get_custom_logger(__name__)
+
+LOG_BUFFER_SIZE = 256 * 1024
+LOG_FLUSH_INTERVAL = 0.5
+LOG_FSYNC_INTERVAL = 5
+# how long to wait for the end of a stream after docker reported the container exit
+EXIT_GRACE_PERIOD = 2
+FRAME_HEADER = struct.Struct(">BxxxL")
+
+
+class LogStream:
+    def __init__(self, container, log_path, listeners, tty):
+        self.container_id = container.id
+        self.short_id = container.short_id
+        self.log_path = log_path
+        self.listeners = listeners
+        self.tty = tty
+        self.lock = threading.Lock()
+        self.sock = None
+        self.frames = bytearray()
+        self.file = None
+        self.dirty = False
+        self.closed = True
+        self.exited_at = None
+        self.exit_code = None
+        self.restarted = False
+        self.attached_at = 0
+        self.bytes = 0
+        self.lines = 0
+
+    def write(self, payload):
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(payload)
+            self.dirty = True
+        self.bytes += len(payload)
+        self.lines += payload.count(b"\n")
+        for listener in self.listeners:
+            try:
+                listener(payload)
+            except Exception as ex:
+                logger.error(f"Log listener failed for container {self.short_id}: {ex}")
+
+    def flush(self, fsync=False):
+        with self.lock:
+            if self.file is None:
+                return
+            if self.dirty:
+                self.file.flush()
+                self.dirty = False
+            if fsync:
+                os.fsync(self.file.fileno())
+
+
+class LogCollector:
+    """
+    Single thread that multiplexes the log streams of all containers and writes them to their log files.
+    Writes are buffered; files are flushed every LOG_FLUSH_INTERVAL and fsynced every LOG_FSYNC_INTERVAL seconds,
+    readers call flush() to get an up to date file. Container exits and restarts come from docker events.
+    """
+
+    def __init__(self):
+        self._client = docker.from_env()
+        self._selector = selectors.DefaultSelector()
+        self._streams = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ, None)
+        self._last_fsync = time()
+        self._follow_logged = False
+        self._thread = threading.Thread(target=self._run, name="log_collector", daemon=True)
+        self._thread.start()
+
+    def add(self, container, log_path, listeners=None):
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        tty = container.attrs.get("Config", {}).get("Tty", False)
+        stream = LogStream(container, log_path, listeners or [], tty)
+        with self._lock:
+            self._streams[container.id] = stream
+        self._attach(stream, replay=True)
+        get_docker_event_bus().subscribe(container.id, self._on_docker_event)
+        logger.debug(f"Collecting logs of container {container.short_id} into {log_path}")
+
+    def flush(self, log_path):
+        for stream in self._find(log_path):
+            stream.flush()
+
+    def flush_all(self):
+        for stream in self._all_streams():
+            stream.flush()
+
+    def stats(self, container_id):
+        stream = self._streams.get(container_id)
+        if stream is None:
+            return None
+        return {"bytes": stream.bytes, "lines": stream.lines, "exit_code": stream.exit_code}
+
+    def close_all(self):
+        for stream in self._all_streams():
+            self._close(stream)
+
+    def _find(self, log_path):
+        return [stream for stream in self._all_streams() if stream.log_path == log_path]
+
+    def _all_streams(self):
+        with self._lock:
+            return list(self._streams.values())
+
+    def _attach(self, stream, replay):
+        params = {"stdout": 1, "stderr": 1, "stream": 1, "logs": 1 if replay else 0}
+        sock = self._client.api.attach_socket(stream.container_id, params=params)
+        raw_sock = getattr(sock, "_sock", sock)
+        reader = buffered_reader(sock)
+        if reader is None or not isinstance(raw_sock, socket.socket):
+            # npipe, ssh or a docker SDK laying out its response differently, follow the logs endpoint instead
+            if not self._follow_logged:
+                self._follow_logged = True
+                logger.warning("Attach socket doesn't expose its read buffer, following container logs with one thread per container")
+            sock.close()
+            self._follow(stream, replay)
+            return
+        raw_sock.setblocking(False)
+        # the HTTP layer may already hold the first bytes of the stream in its read buffer
+        buffered = b""
+        while True:
+            chunk = reader.read1(1 << 16)
+            if not chunk:
+                break
+            buffered += chunk
+
+        self._open(stream, replay)
+        stream.sock = raw_sock
+        with self._lock:
+            self._pending.append((stream, buffered))
+        self._wakeup_writer.send(b"x")
+
+    def _follow(self, stream, replay):
+        since = None if replay else datetime.now()
+        self._open(stream, replay)
+        stream.sock = None
+
+        def follow():
+            try:
+                for chunk in self._client.api.logs(stream.container_id, stream=True, follow=True, since=since):
+                    stream.write(chunk)
+            except Exception as ex:
+                logger.warning(f"Log stream of container {stream.short_id} failed: {ex}")
+            self._close(stream)
+
+        threading.Thread(target=follow, name=f"log_follow_{stream.short_id}", daemon=True).start()
+
+    def _open(self, stream, replay):
+        with stream.lock:
+            stream.file = open(stream.log_path, "wb" if replay else "ab", buffering=LOG_BUFFER_SIZE)
+        stream.attached_at = time()
+        stream.closed = False
+        stream.exited_at = None
+        stream.frames = bytearray()
+
+    def _on_docker_event(self, event):
+        status = event.get("status") or event.get("Action", "")
+        stream = self._streams.get(event.get("id"))
+        if stream is None:
+            return
+        if status in ["die", "oom"]:
+            stream.exit_code = event.get("Actor", {}).get("Attributes", {}).get("exitCode")
+            stream.exited_at = time()
+            logger.info(f"Container {stream.short_id} has stopped with exit code {stream.exit_code}")
+        elif status == "start" and event.get("timeNano", 0) / 1e9 > stream.attached_at:
+            if stream.closed:
+                logger.debug(f"Container {stream.short_id} started again, re-attaching its log stream")
+                self._attach(stream, replay=False)
+            else:
+                # the old stream hasn't reached its end yet, _close re-attaches once it does
+                stream.restarted = True
+        elif status == "destroy":
+            with self._lock:
+                self._streams.pop(stream.container_id, None)
+            get_docker_event_bus().unsubscribe(stream.container_id, self._on_docker_event)
+
+    def _run(self):
+        while True:
+            try:
+                for key, _ in self._selector.select(timeout=LOG_FLUSH_INTERVAL):
+                    if key.data is None:
+                        self._register_pending()
+                    else:
+                        self._read(key.data)
+                self._housekeeping()
+            except Exception as ex:
+                logger.error(f"Log collector loop failed: {ex}")
+
+    def _register_pending(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for stream, buffered in pending:
+            self._selector.register(stream.sock, selectors.EVENT_READ, stream)
+            if buffered:
+                self._consume(stream, buffered)
+
+    def _read(self, stream):
+        try:
+            data = stream.sock.recv(1 << 16)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as ex:
+            logger.warning(f"Log stream of container {stream.short_id} failed: {ex}")
+            data = b""
+        if data:
+            self._consume(stream, data)
+        else:
+            self._close(stream)
+
+    def _consume(self, stream, data):
+        if stream.tty:
+            stream.write(data)
+            return
+        # without a TTY docker multiplexes stdout/stderr in frames: 1 byte stream type, 3 padding bytes, 4 bytes size
+        frames = stream.frames
+        frames += data
+        offset = 0
+        payloads = []
+        while len(frames) - offset >= FRAME_HEADER.size:
+            _, size = FRAME_HEADER.unpack_from(frames, offset)
+            end = offset + FRAME_HEADER.size + size
+            if end > len(frames):
+                break
+            payloads.append(bytes(frames[offset + FRAME_HEADER.size : end]))
+            offset = end
+        del frames[:offset]
+        if payloads:
+            stream.write(b"".join(payloads))
+
+    def _close(self, stream):
+        if stream.closed:
+            return
+        stream.closed = True
+        if stream.sock is not None:
+            try:
+                self._selector.unregister(stream.sock)
+            except (KeyError, ValueError):
+                pass
+            stream.sock.close()
+        with stream.lock:
+            stream.file.flush()
+            os.fsync(stream.file.fileno())
+            stream.file.close()
+            stream.file = None
+        logger.debug(f"Log stream of container {stream.short_id} closed after {stream.bytes} bytes and {stream.lines} lines")
+        if stream.restarted:
+            stream.restarted = False
+            try:
+                self._attach(stream, replay=False)
+            except Exception as ex:
+                logger.debug(f"Could not re-attach to container {stream.short_id}: {ex}")
+
+    def _housekeeping(self):
+        now = time()
+        fsync = now - self._last_fsync >= LOG_FSYNC_INTERVAL
+        if fsync:
+            self._last_fsync = now
+        for stream in self._all_streams():
+            if stream.closed:
+                continue
+            # followed streams end by themselves once docker has sent the last line
+            if stream.sock is not None and stream.exited_at is not None and now - stream.exited_at > EXIT_GRACE_PERIOD:
+                self._close(stream)
+            else:
+                stream.flush(fsync=fsync)
+
+
+def buffered_reader(sock):
+    # the response docker keeps on the attach socket, None when this SDK version or transport doesn't expose it
+    try:
+        reader = sock._response.raw._fp.fp
+    except AttributeError:
+        return None
+    return reader if hasattr(reader, "read1") else None
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def get_log_collector():
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = LogCollector()
+            atexit.register(_collector.close_all)
+    return _collector
+
+
+def flush_container_logs(log_path=None):
+    # nothing to flush when no container was started in this process
+    if _collector is None:
+        return
+    if log_path is None:
+        _collector.flush_all()
+    else:
+        _collector.flush(log_path)
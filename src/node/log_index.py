@@ -0,0 +1,310 @@
+import json
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime
+from src.libs.custom_logger import get_custom_logger
+from src.node.log_collector import flush_container_logs
+
+logger = get_custom_logger(__name__)
+
+LOG_LEVELS = ["TRACE", "DEBUG", "INFO", "NOTICE", "WARN", "ERROR", "FATAL"]
+LEVEL_ALIASES = {
+    "TRC": 0,
+    "TRACE": 0,
+    "DBG": 1,
+    "DEBUG": 1,
+    "INF": 2,
+    "INFO": 2,
+    "NTC": 3,
+    "NOTICE": 3,
+    "WRN": 4,
+    "WARN": 4,
+    "WARNING": 4,
+    "ERR": 5,
+    "ERROR": 5,
+    "FAT": 6,
+    "FATAL": 6,
+    "DPANIC": 6,
+    "PANIC": 6,
+}
+
+# nwaku (chronicles): INF 2024-05-10 12:34:56.789+00:00 Created WakuMetadata protocol    topics="waku node" tid=1 clusterId=1
+NWAKU_LINE = re.compile(r"(TRC|DBG|INF|NTC|WRN|ERR|FAT) (\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:\d\d)?) (.*)")
+NWAKU_FIELD_START = re.compile(r"\s+[\w.-]+=")
+NWAKU_FIELD = re.compile(r'([\w.-]+)=("(?:[^"\\]|\\.)*"|\S*)')
+NWAKU_TOPICS = re.compile(r'\btopics=(?:"([^"]*)"|(\S+))')
+# go-waku (zap console): 2024-05-10T12:34:56.789Z	INFO	gowaku.node2	node/wakunode2.go:180	metadata protocol started	{"cluster": 1}
+GOWAKU_LINE = re.compile(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:?\d\d)?)\t([A-Za-z]+)\t(.*)")
+GOWAKU_CALLER = re.compile(r"\S+\.go:\d+$")
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+LogRecord = namedtuple("LogRecord", ["timestamp", "level", "topic", "message", "fields", "line"])
+
+
+def level_value(level):
+    if isinstance(level, int):
+        return level
+    value = LEVEL_ALIASES.get(level.upper())
+    if value is None:
+        raise ValueError(f"Unknown log level {level}, expected one of {LOG_LEVELS}")
+    return value
+
+
+def to_epoch(moment):
+    if moment is None or isinstance(moment, (int, float)):
+        return moment
+    return moment.timestamp()
+
+
+def parse_timestamp(text):
+    return datetime.fromisoformat(text.replace(" ", "T", 1)).timestamp()
+
+
+def parse_nwaku_line(line):
+    match = NWAKU_LINE.match(line)
+    if match is None:
+        return None
+    level, timestamp, rest = match.groups()
+    field_start = NWAKU_FIELD_START.search(rest)
+    message = rest[: field_start.start()] if field_start else rest
+    topics = NWAKU_TOPICS.search(rest, field_start.start()) if field_start else None
+    topic = (topics.group(1) or topics.group(2)) if topics else ""
+    return parse_timestamp(timestamp), LEVEL_ALIASES[level], topic, message.strip()
+
+
+def parse_nwaku_fields(line):
+    match = NWAKU_LINE.match(line)
+    rest = match.group(3) if match else line
+    field_start = NWAKU_FIELD_START.search(rest)
+    if field_start is None:
+        return {}
+    fields = {}
+    for key, value in NWAKU_FIELD.findall(rest, field_start.start()):
+        fields[key] = value[1:-1] if value.startswith('"') and value.endswith('"') and len(value) > 1 else value
+    return fields
+
+
+def parse_gowaku_line(line):
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        timestamp = entry.get("ts")
+        if isinstance(timestamp, str):
+            timestamp = parse_timestamp(timestamp)
+        return timestamp or 0.0, LEVEL_ALIASES.get(str(entry.get("level", "")).upper(), 2), entry.get("logger", ""), entry.get("msg", "")
+
+    match = GOWAKU_LINE.match(line)
+    if match is None:
+        return None
+    timestamp, level, rest = match.groups()
+    parts = rest.split("\t")
+    if len(parts) > 1 and parts[-1].startswith("{"):
+        parts.pop()
+    message = parts.pop()
+    topic = next((part for part in parts if not GOWAKU_CALLER.match(part)), parts[0] if parts else "")
+    return parse_timestamp(timestamp), LEVEL_ALIASES.get(level.upper(), 2), topic, message.strip()
+
+
+def parse_gowaku_fields(line):
+    if line.startswith("{"):
+        entry = json.loads(line)
+        return {key: value for key, value in entry.items() if key not in ("ts", "level", "logger", "caller", "msg")}
+    last = line.rsplit("\t", 1)[-1]
+    if last.startswith("{"):
+        try:
+            return json.loads(last)
+        except ValueError:
+            pass
+    return {}
+
+
+PARSERS = {"nwaku": (parse_nwaku_line, parse_nwaku_fields), "gowaku": (parse_gowaku_line, parse_gowaku_fields)}
+
+
+class LogIndex:
+    """
+    Compact index over the log of one container, fed live by the log collector. Every entry keeps its
+    timestamp, level, topic (nwaku) or logger (go-waku), an interned message id and its byte range in the
+    log file; fields and full lines are only read back from the file for the entries a query returns.
+    Lines that don't start a new entry (stack traces, wrapped output) belong to the entry before them.
+    """
+
+    def __init__(self, log_path, node_type):
+        self._log_path = log_path
+        self._parse_line, self._parse_fields = PARSERS[node_type]
+        self._lock = threading.Lock()
+        self._timestamps = array("d")
+        self._levels = array("b")
+        self._topic_ids = array("I")
+        self._message_ids = array("I")
+        self._starts = array("Q")
+        self._ends = array("Q")
+        self._topics = []
+        self._topic_lookup = {}
+        self._messages = []
+        self._message_lookup = {}
+        self._entries_by_message = []
+        self._ordered = True
+        self._offset = 0
+        self._carry = b""
+        self.lines = 0
+        self.unparsed_lines = 0
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def on_log_chunk(self, chunk):
+        data = self._carry + chunk
+        start = 0
+        with self._lock:
+            while True:
+                end = data.find(b"\n", start)
+                if end == -1:
+                    break
+                self._add_line(data[start:end], self._offset + start, self._offset + end + 1)
+                start = end + 1
+            self._offset += start
+        self._carry = data[start:]
+
+    def _add_line(self, raw_line, start, end):
+        self.lines += 1
+        line = raw_line.decode("utf-8", errors="replace").rstrip("\r")
+        if "\x1b" in line:
+            line = ANSI_ESCAPE.sub("", line)
+        try:
+            parsed = self._parse_line(line)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            self.unparsed_lines += 1
+            if self._ends:
+                self._ends[-1] = end
+            return
+
+        timestamp, level, topic, message = parsed
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            self._ordered = False
+        entry = len(self._timestamps)
+        self._timestamps.append(timestamp)
+        self._levels.append(level)
+        self._topic_ids.append(self._intern_topic(topic))
+        self._message_ids.append(self._intern_message(message))
+        self._entries_by_message[self._message_ids[-1]].append(entry)
+        self._starts.append(start)
+        self._ends.append(end)
+
+    def _intern_topic(self, topic):
+        topic_id = self._topic_lookup.get(topic)
+        if topic_id is None:
+            topic_id = self._topic_lookup[topic] = len(self._topics)
+            self._topics.append(topic)
+        return topic_id
+
+    def _intern_message(self, message):
+        message_id = self._message_lookup.get(message)
+        if message_id is None:
+            message_id = self._message_lookup[message] = len(self._messages)
+            self._messages.append(message)
+            self._entries_by_message.append(array("I"))
+        return message_id
+
+    def query(self, since=None, until=None, level=None, min_level=None, topic=None, message=None, message_contains=None, limit=None, **fields):
+        """
+        Returns LogRecords matching all given criteria. `since`/`until` take epoch seconds or datetimes,
+        `message` is an exact lookup, `message_contains` a case-insensitive match over the distinct messages
+        and keyword arguments compare against the fields of the entry.
+        """
+        entries = self._select(since, until, level, min_level, topic, message, message_contains)
+        records = []
+        flush_container_logs(self._log_path)
+        with open(self._log_path, "rb") as log_file:
+            for entry in entries:
+                record = self._read_record(log_file, entry)
+                if all(str(record.fields.get(key)) == str(value) for key, value in fields.items()):
+                    records.append(record)
+                    if limit is not None and len(records) >= limit:
+                        break
+        return records
+
+    def count(self, since=None, until=None, level=None, min_level=None, topic=None, message=None, message_contains=None, **fields):
+        if fields:
+            return len(self.query(since, until, level, min_level, topic, message, message_contains, **fields))
+        return sum(1 for _ in self._select(since, until, level, min_level, topic, message, message_contains))
+
+    def level_counts(self):
+        counts = [0] * len(LOG_LEVELS)
+        with self._lock:
+            for level in self._levels:
+                counts[level] += 1
+        return {name: count for name, count in zip(LOG_LEVELS, counts) if count}
+
+    def summary(self, min_level="WARN", max_records=50):
+        problems = self.query(min_level=min_level, limit=max_records)
+        lines = [f"{len(self)} entries from {self.lines} lines, levels: {self.level_counts()}"]
+        lines.extend(record.line for record in problems)
+        return "\n".join(lines)
+
+    def _select(self, since, until, level, min_level, topic, message, message_contains):
+        since, until = to_epoch(since), to_epoch(until)
+        level = level_value(level) if level is not None else None
+        min_level = level_value(min_level) if min_level is not None else None
+        with self._lock:
+            total = len(self._timestamps)
+            topic_id = self._topic_lookup.get(topic, -1) if topic is not None else None
+            if message is not None or message_contains is not None:
+                message_ids = self._matching_messages(message, message_contains)
+                candidates = sorted(entry for message_id in message_ids for entry in self._entries_by_message[message_id])
+            elif self._ordered and (since is not None or until is not None):
+                low = bisect_left(self._timestamps, since, 0, total) if since is not None else 0
+                high = bisect_right(self._timestamps, until, 0, total) if until is not None else total
+                candidates = range(low, high)
+            else:
+                candidates = range(total)
+
+        for entry in candidates:
+            if topic_id is not None and self._topic_ids[entry] != topic_id:
+                continue
+            entry_level = self._levels[entry]
+            if level is not None and entry_level != level:
+                continue
+            if min_level is not None and entry_level < min_level:
+                continue
+            timestamp = self._timestamps[entry]
+            if since is not None and timestamp < since:
+                continue
+            if until is not None and timestamp > until:
+                continue
+            yield entry
+
+    def _matching_messages(self, message, message_contains):
+        if message is not None:
+            message_id = self._message_lookup.get(message)
+            message_ids = [] if message_id is None else [message_id]
+        else:
+            message_ids = range(len(self._messages))
+        if message_contains is not None:
+            needle = message_contains.lower()
+            message_ids = [message_id for message_id in message_ids if needle in self._messages[message_id].lower()]
+        return message_ids
+
+    def _read_record(self, log_file, entry):
+        log_file.seek(self._starts[entry])
+        raw = log_file.read(self._ends[entry] - self._starts[entry])
+        line = ANSI_ESCAPE.sub("", raw.decode("utf-8", errors="replace")).rstrip("\r\n")
+        try:
+            fields = self._parse_fields(line.split("\n", 1)[0])
+        except ValueError:
+            fields = {}
+        return LogRecord(
+            timestamp=self._timestamps[entry],
+            level=LOG_LEVELS[self._levels[entry]],
+            topic=self._topics[self._topic_ids[entry]],
+            message=self._messages[self._message_ids[entry]],
+            fields=fields,
+            line=line,
+        )
@@ -0,0 +1,154 @@
+import os
+import re
+import threading
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+# opt-in cap for searches that only need to know whether a keyword appears, like the error keyword check
+MAX_LINES_PER_PATTERN = 50
+READ_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class LogMatches(dict):
+    # keyword -> matching lines (the first max_lines when capped), `counts` holds the total number of matching lines per keyword
+    def __init__(self, lines, counts):
+        super().__init__(lines)
+        self.counts = counts
+
+
+class KeywordMatcher:
+    """
+    All keywords are folded into one regex, so a line is scanned once no matter how many keywords there are.
+    Plain keywords are matched against the lowercased text without IGNORECASE, which keeps the regex engine fast.
+    Only lines hit by the combined regex are checked keyword by keyword, on that line alone, so a pattern that
+    matched across a line break in the combined search doesn't count. `max_lines` caps the kept lines per keyword,
+    None keeps every match.
+    """
+
+    def __init__(self, keywords, use_regex, max_lines=None):
+        self.keywords = list(keywords)
+        self._use_regex = use_regex
+        patterns = self.keywords if use_regex else [re.escape(keyword) for keyword in self.keywords]
+        self._combined_ignorecase = re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE | re.MULTILINE)
+        if use_regex:
+            self._individual = [(keyword, re.compile(pattern, re.IGNORECASE).search) for keyword, pattern in zip(self.keywords, patterns)]
+        else:
+            self._combined_lowercase = re.compile("|".join(re.escape(keyword.lower()) for keyword in self.keywords))
+            self._individual = [(keyword, lambda line, needle=keyword.lower(): needle in line) for keyword in self.keywords]
+        self._max_lines = max_lines
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.counts = {keyword: 0 for keyword in self.keywords}
+        self.lines = {keyword: [] for keyword in self.keywords}
+
+    def feed(self, text):
+        if not self.keywords:
+            return
+        haystack, combined = text, self._combined_ignorecase
+        if not self._use_regex:
+            lowered = text.lower()
+            # a few unicode characters change length when lowercased, offsets would not line up anymore
+            if len(lowered) == len(text):
+                haystack, combined = lowered, self._combined_lowercase
+
+        position = 0
+        while True:
+            match = combined.search(haystack, position)
+            if match is None:
+                return
+            line_start = haystack.rfind("\n", 0, match.start()) + 1
+            line_end = haystack.find("\n", match.start())
+            if line_end == -1:
+                line_end = len(haystack)
+            line = text[line_start:line_end]
+            candidate = line if self._use_regex else line.lower()
+            for keyword, matches in self._individual:
+                if matches(candidate):
+                    self._count(keyword, line)
+            position = line_end + 1
+
+    def _count(self, keyword, line):
+        self.counts[keyword] += 1
+        if self._max_lines is None or len(self.lines[keyword]) < self._max_lines:
+            self.lines[keyword].append(line.strip())
+
+    def result(self):
+        return LogMatches({keyword: list(lines) for keyword, lines in self.lines.items()}, dict(self.counts))
+
+
+class LogScanner:
+    """
+    Incremental keyword search over one growing log file. Every keyword set that was searched for once stays
+    registered, and each search scans only the bytes that were appended since the previous one, for all
+    registered keyword sets at once.
+    """
+
+    def __init__(self, log_path):
+        self._log_path = log_path
+        self._matchers = {}
+        self._lock = threading.Lock()
+
+    def register(self, keywords, use_regex=False, max_lines=None):
+        key = (tuple(keywords), use_regex, max_lines)
+        with self._lock:
+            if key not in self._matchers:
+                self._matchers[key] = KeywordMatcher(keywords, use_regex, max_lines)
+            return self._matchers[key]
+
+    def reset(self):
+        with self._lock:
+            for matcher in self._matchers.values():
+                matcher.reset()
+
+    def search(self, keywords, use_regex=False, max_lines=None):
+        matcher = self.register(keywords, use_regex, max_lines)
+        with self._lock:
+            self._scan_new_bytes()
+            return matcher.result()
+
+    def _scan_new_bytes(self):
+        size = os.path.getsize(self._log_path)
+        matchers = list(self._matchers.values())
+        if any(matcher.offset > size for matcher in matchers):
+            # the file was recreated by a new container using the same log path
+            for matcher in matchers:
+                matcher.reset()
+        start = min(matcher.offset for matcher in matchers)
+        if start >= size:
+            return
+
+        with open(self._log_path, "rb") as log_file:
+            log_file.seek(start)
+            position = start
+            carry = b""
+            while True:
+                block = log_file.read(READ_BLOCK_SIZE)
+                if not block:
+                    break
+                data = carry + block
+                # only complete lines are scanned, the rest waits for the next search
+                last_newline = data.rfind(b"\n")
+                if last_newline == -1:
+                    carry = data
+                    continue
+                complete, carry = data[: last_newline + 1], data[last_newline + 1 :]
+                end = position + len(complete)
+                for matcher in matchers:
+                    if matcher.offset < end:
+                        matcher.feed(complete[max(matcher.offset - position, 0) :].decode("utf-8", errors="replace"))
+                        matcher.offset = end
+                position = end
+
+
+_scanners = {}
+_scanners_lock = threading.Lock()
+
+
+def get_log_scanner(log_path):
+    with _scanners_lock:
+        if log_path not in _scanners:
+            _scanners[log_path] = LogScanner(log_path)
+        return _scanners[log_path]
@@ -0,0 +1,177 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from uuid import uuid4
+from src.data_storage import DS
+from src.libs.custom_logger import get_custom_logger
+from src.node.waku_node import WakuNode
+
+logger = get_custom_logger(__name__)
+
+# how long a released node may take to notice that the test's nodes went away
+PEER_DISCONNECT_TIMEOUT = 10
+
+
+def is_connected(peer):
+    # go-waku and newer nwaku report the connection on the peer, older nwaku per protocol
+    connected = peer.get("connected")
+    if connected is not None:
+        return connected is True or connected == "Connected"
+    return any(protocol.get("connected") for protocol in peer.get("protocols", []) if isinstance(protocol, dict))
+
+
+def pool_key(image, kwargs):
+    return image, tuple(sorted((key, str(value)) for key, value in kwargs.items()))
+
+
+class NodePool:
+    """
+    Keeps already started nodes around so tests can lease them instead of paying the container boot.
+    Opt-in with USE_NODE_POOL=true: a pooled node keeps its nodekey and peer store from one test to the next.
+    The flag set is part of the pool key, so only flag sets that don't point at other per test nodes can be pooled.
+    Used by the setup fixtures for:
+      - relay nodes: relay="true"
+      - filter service nodes: relay="true", filter="true" (plus min_relay_peers_to_publish="0" on go-waku)
+    Not poolable: store nodes (their archive is rarely empty after a test, so they would be replaced every time),
+    flags naming other nodes (discv5_bootstrap_node, storenode, filternode, lightpushnode, staticnode), RLN credentials,
+    and nodes whose cumulative state a test measures (metrics), those classes set use_node_pool = False.
+    On release subscriptions are removed and the peers, which are the test's own nodes stopped before the release,
+    must have disconnected. Nodes that still have connected peers, stored messages or errors in their logs are
+    replaced by a fresh node started in the background, the next lease waits for that one instead of booting its own.
+    """
+
+    def __init__(self, max_workers=4):
+        self._idle = defaultdict(list)
+        self._warming = defaultdict(list)
+        self._leased = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="node_pool")
+        self._closed = False
+
+    def warm_up(self, image, count=1, **kwargs):
+        key = pool_key(image, kwargs)
+        with self._lock:
+            for _ in range(count):
+                self._warming[key].append(self._executor.submit(self._start_node, image, kwargs))
+
+    def lease(self, image, **kwargs):
+        key = pool_key(image, kwargs)
+        node = self._take_idle(key)
+        if node is None:
+            logger.debug(f"No warm node for {key}, starting a new one")
+            node = self._start_node(image, kwargs)
+        with self._lock:
+            self._leased[id(node)] = (key, image, kwargs)
+        DS.leased_nodes.append(node)
+        logger.debug(f"Leased pooled node {node.image}")
+        return node
+
+    def release(self, node):
+        with self._lock:
+            key, image, kwargs = self._leased.pop(id(node))
+        if node in DS.leased_nodes:
+            DS.leased_nodes.remove(node)
+        if self._closed:
+            node.stop()
+            return
+        if self._reset_node(node, kwargs):
+            with self._lock:
+                self._idle[key].append(node)
+            logger.debug(f"Pooled node {node.image} returned to the pool")
+        else:
+            logger.debug(f"Pooled node {node.image} could not be cleaned, recycling it")
+            with self._lock:
+                self._warming[key].append(self._executor.submit(self._recycle, node, image, kwargs))
+
+    def shutdown(self):
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            nodes = [node for nodes in self._idle.values() for node in nodes]
+            warming = [future for futures in self._warming.values() for future in futures]
+            self._idle.clear()
+            self._warming.clear()
+        nodes.extend(future.result() for future in warming if future.exception() is None and future.result() is not None)
+        for node in nodes:
+            try:
+                node.stop()
+            except Exception as ex:
+                logger.error(f"Failed to stop pooled node {node.image}: {ex}")
+
+    def _take_idle(self, key):
+        with self._lock:
+            if self._idle[key]:
+                return self._idle[key].pop()
+            warming = self._warming[key].pop(0) if self._warming[key] else None
+        if warming is not None:
+            try:
+                return warming.result()
+            except Exception as ex:
+                logger.error(f"Warm up of pooled node failed: {ex}")
+        return None
+
+    def _start_node(self, image, kwargs):
+        node = WakuNode(image, f"pool_{uuid4().hex[:8]}")
+        node.pooled = True
+        node.start(**kwargs)
+        return node
+
+    def _recycle(self, node, image, kwargs):
+        try:
+            node.stop()
+        except Exception as ex:
+            logger.error(f"Failed to stop recycled node {node.image}: {ex}")
+        if self._closed:
+            return None
+        return self._start_node(image, kwargs)
+
+    def _reset_node(self, node, kwargs):
+        try:
+            if not node.is_running():
+                return False
+            node.reset_subscriptions()
+            if not self._wait_for_peers_to_disconnect(node):
+                return False
+            if kwargs.get("store") == "true":
+                if not node.is_nwaku():
+                    return False
+                if node.get_store_messages(page_size=1, include_data="false").get("messages"):
+                    return False
+            node.check_waku_log_errors()
+        except Exception as ex:
+            logger.debug(f"Resetting pooled node failed with: {ex}")
+            return False
+        return True
+
+    def _wait_for_peers_to_disconnect(self, node, timeout=PEER_DISCONNECT_TIMEOUT):
+        # there is no REST endpoint to drop a peer, the test's nodes are stopped first and their connections close with them
+        deadline = monotonic() + timeout
+        while True:
+            connected = [peer for peer in node.get_peers() if is_connected(peer)]
+            if not connected:
+                return True
+            if monotonic() >= deadline:
+                logger.debug(f"Pooled node {node.image} still has {len(connected)} connected peers")
+                return False
+            sleep(0.5)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_node_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = NodePool()
+    return _pool
+
+
+def shutdown_node_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
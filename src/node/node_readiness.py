@@ -0,0 +1,97 @@
+import threading
+from time import time
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+STARTUP_STAGES = ["container_created", "process_started", "rest_up", "health_ready", "rln_ready"]
+
+
+class ContainerExitedError(Exception):
+    pass
+
+
+class StartupWatcher:
+    """
+    Collects the signals a node gives while booting: log lines announcing the REST server, docker health
+    and exit events. Waiters are woken up by those signals instead of sleeping, and every stage is
+    recorded in a timeline relative to the moment the container was requested.
+    """
+
+    def __init__(self, log_markers):
+        self._log_markers = [(stage, marker.encode()) for stage, markers in log_markers.items() for marker in markers]
+        self._max_marker_len = max((len(marker) for _, marker in self._log_markers), default=0)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._started_at = time()
+            self.timeline = {}
+            self.exit_code = None
+            self._signals = {stage: threading.Event() for stage in STARTUP_STAGES}
+            self._wakeup = threading.Event()
+            self._tail = b""
+
+    def record(self, stage):
+        with self._lock:
+            if stage not in self.timeline:
+                self.timeline[stage] = round(time() - self._started_at, 3)
+            self._signals[stage].set()
+        self._wakeup.set()
+
+    def is_recorded(self, stage):
+        return stage in self.timeline
+
+    def on_log_chunk(self, chunk):
+        if "process_started" not in self.timeline:
+            self.record("process_started")
+        pending = [(stage, marker) for stage, marker in self._log_markers if not self._signals[stage].is_set()]
+        if not pending:
+            return
+        data = self._tail + chunk
+        for stage, marker in pending:
+            if marker in data:
+                logger.debug(f"Log signal for stage {stage} received")
+                self.record(stage)
+        self._tail = data[-self._max_marker_len :]
+
+    def on_docker_event(self, event):
+        status = event.get("status") or event.get("Action", "")
+        if event.get("timeNano", 0) / 1e9 < self._started_at:
+            # late delivery of something that happened before a restart
+            return
+        if status in ["die", "oom"]:
+            self.exit_code = event.get("Actor", {}).get("Attributes", {}).get("exitCode")
+            self._wakeup.set()
+        elif status.startswith("health_status"):
+            # the container health check flipped, worth confirming over REST right away
+            self._wakeup.set()
+
+    def wait_for(self, stage, probe, deadline, first_probe_after=0.25, max_probe_interval=1):
+        """
+        Blocks until `probe()` confirms `stage`. The probe runs as soon as a signal for the stage arrives;
+        without signals it runs after `first_probe_after` seconds, backing off up to `max_probe_interval`.
+        """
+        interval = first_probe_after
+        signal_used = False
+        while True:
+            if self.exit_code is not None:
+                raise ContainerExitedError(f"Container exited with code {self.exit_code} while waiting for {stage}")
+            remaining = deadline - time()
+            if remaining <= 0:
+                return probe()
+            if not signal_used and self._signals[stage].is_set():
+                signal_used = True
+            elif not self._wakeup.wait(timeout=min(interval, remaining)):
+                interval = min(interval * 2, max_probe_interval)
+            self._wakeup.clear()
+            try:
+                if probe():
+                    self.record(stage)
+                    return True
+            except Exception as ex:
+                logger.debug(f"Probe for stage {stage} not successful yet: {ex}")
+
+    def summary(self):
+        return " ".join(f"{stage}={self.timeline[stage]}s" for stage in STARTUP_STAGES if stage in self.timeline)
@@ -0,0 +1,111 @@
+import ipaddress
+import os
+import socket
+import threading
+from src.env_vars import SUBNET, IP_RANGE, GATEWAY, PG_PORT
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+# above the registered service ports, so nodes never take the port of a well known service on the host
+PORT_RANGE = (20000, 65535)
+# published on the host by containers started outside of the allocator
+RESERVED_PORTS = {int(PG_PORT)}
+
+
+def xdist_worker():
+    # "gw3" -> 3, workers are numbered from 0; without xdist there is a single worker
+    worker = os.getenv("PYTEST_XDIST_WORKER", "gw0")
+    index = int(worker[2:]) if worker.startswith("gw") and worker[2:].isdigit() else 0
+    count = int(os.getenv("PYTEST_XDIST_WORKER_COUNT", "1"))
+    return index, max(count, index + 1)
+
+
+def worker_slice(first, last, index, count):
+    size = (last - first) // count
+    return first + index * size, first + (index + 1) * size
+
+
+def is_port_free(port):
+    # the REST and libp2p ports are TCP, discv5 listens on UDP
+    for kind in (socket.SOCK_STREAM, socket.SOCK_DGRAM):
+        with socket.socket(socket.AF_INET, kind) as sock:
+            try:
+                sock.bind(("0.0.0.0", port))
+            except OSError:
+                return False
+    return True
+
+
+class ResourceAllocator:
+    """
+    Hands out port blocks and static container IPs that don't overlap between xdist workers.
+    Every worker owns a disjoint slice of the port range and of the subnet; inside its slice
+    a worker walks a cursor, skipping what is leased already or bound on the host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leased_ports = set()
+        self._leased_ips = set()
+        index, count = xdist_worker()
+
+        self._port_first, self._port_last = worker_slice(PORT_RANGE[0], PORT_RANGE[1], index, count)
+        self._port_cursor = self._port_first
+
+        # docker assigns IPs from IP_RANGE dynamically (postgres and friends), static IPs come from the rest of the subnet
+        dynamic_range = ipaddress.ip_network(IP_RANGE)
+        reserved = {ipaddress.ip_address(GATEWAY)}
+        candidates = [ip for ip in ipaddress.ip_network(SUBNET).hosts() if ip not in dynamic_range and ip not in reserved]
+        ip_first, ip_last = worker_slice(0, len(candidates), index, count)
+        self._ips = candidates[ip_first:ip_last]
+        self._ip_cursor = 0
+        logger.debug(f"Worker {index + 1}/{count} owns ports {self._port_first}-{self._port_last - 1} and {len(self._ips)} IPs")
+
+    def lease_ports(self, count=5):
+        with self._lock:
+            span = self._port_last - self._port_first
+            for _ in range(span // count):
+                base_port = self._port_cursor
+                if base_port + count > self._port_last:
+                    base_port = self._port_first
+                self._port_cursor = base_port + count
+                block = range(base_port, base_port + count)
+                if any(port in self._leased_ports or port in RESERVED_PORTS for port in block):
+                    continue
+                if not all(is_port_free(port) for port in block):
+                    logger.debug(f"Ports {base_port}-{base_port + count - 1} are bound on the host, skipping them")
+                    continue
+                self._leased_ports.update(block)
+                return [str(port) for port in block]
+        raise RuntimeError(f"No free block of {count} ports left in {self._port_first}-{self._port_last - 1}")
+
+    def release_ports(self, ports):
+        with self._lock:
+            self._leased_ports.difference_update(int(port) for port in ports)
+
+    def lease_ip(self):
+        with self._lock:
+            for _ in range(len(self._ips)):
+                ip = str(self._ips[self._ip_cursor])
+                self._ip_cursor = (self._ip_cursor + 1) % len(self._ips)
+                if ip not in self._leased_ips:
+                    self._leased_ips.add(ip)
+                    return ip
+        raise RuntimeError("No free static IP left for this worker")
+
+    def release_ip(self, ip):
+        with self._lock:
+            self._leased_ips.discard(ip)
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_resource_allocator():
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = ResourceAllocator()
+    return _allocator
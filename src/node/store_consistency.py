@@ -0,0 +1,86 @@
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+StoreDiff = namedtuple("StoreDiff", ["expected", "actual", "missing", "extra", "reordered", "duplicates"])
+
+
+def longest_ordered_run(ranks):
+    # indices of one longest strictly increasing subsequence, patience sorting in O(n log n)
+    tails, tail_indices, previous = [], [], [-1] * len(ranks)
+    for index, rank in enumerate(ranks):
+        position = bisect_left(tails, rank)
+        if position == len(tails):
+            tails.append(rank)
+            tail_indices.append(index)
+        else:
+            tails[position] = rank
+            tail_indices[position] = index
+        previous[index] = tail_indices[position - 1] if position else -1
+    run = []
+    index = tail_indices[-1] if tail_indices else -1
+    while index != -1:
+        run.append(index)
+        index = previous[index]
+    return set(run)
+
+
+def compare_store_hashes(expected, actual):
+    """
+    Compares the hashes a store returned with the expected ones using sets and one pass over each list.
+    Reordered are the fewest messages that, moved elsewhere, would put the rest in the expected order.
+    """
+    expected_ranks = {message_hash: rank for rank, message_hash in enumerate(expected)}
+    actual_set = set(actual)
+    missing = [message_hash for message_hash in expected if message_hash not in actual_set]
+    extra = [message_hash for message_hash in actual if message_hash not in expected_ranks]
+    duplicates = len(actual) - len(actual_set)
+    common = [message_hash for message_hash in dict.fromkeys(actual) if message_hash in expected_ranks]
+    in_order = longest_ordered_run([expected_ranks[message_hash] for message_hash in common])
+    reordered = [message_hash for index, message_hash in enumerate(common) if index not in in_order]
+    return StoreDiff(len(expected), len(actual), missing, extra, reordered, duplicates)
+
+
+class StoreConsistencyReport:
+    def __init__(self, diffs, ordered=True):
+        # node -> StoreDiff
+        self.diffs = diffs
+        self.ordered = ordered
+
+    def inconsistent_nodes(self):
+        return [node for node, diff in self.diffs.items() if not self.is_consistent(diff)]
+
+    def is_consistent(self, diff):
+        return not (diff.missing or diff.extra or diff.duplicates or (self.ordered and diff.reordered))
+
+    @property
+    def consistent(self):
+        return not self.inconsistent_nodes()
+
+    def summary(self, max_hashes=5):
+        lines = []
+        for node, diff in self.diffs.items():
+            line = f"{node.image}: {diff.actual}/{diff.expected} messages, {len(diff.missing)} missing, {len(diff.extra)} extra, "
+            line += f"{len(diff.reordered)} reordered, {diff.duplicates} duplicates"
+            for name in ["missing", "extra", "reordered"]:
+                hashes = getattr(diff, name)
+                if hashes:
+                    line += f"\n  {name}: {hashes[:max_hashes]}{' ...' if len(hashes) > max_hashes else ''}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def check_store_consistency(store_nodes, expected_hashes, fetch_hashes, ordered=True):
+    """
+    Fetches the full store of every node at once, `fetch_hashes(node)` returns the hashes in store order,
+    and compares each with `expected_hashes(node)`, the hashes as that node type encodes them.
+    """
+    with ThreadPoolExecutor(max_workers=len(store_nodes) or 1, thread_name_prefix="store_check") as executor:
+        fetched = list(executor.map(fetch_hashes, store_nodes))
+    diffs = {node: compare_store_hashes(expected_hashes(node), actual) for node, actual in zip(store_nodes, fetched)}
+    report = StoreConsistencyReport(diffs, ordered)
+    logger.debug(f"Store consistency:\n{report.summary()}")
+    return report
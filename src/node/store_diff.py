@@ -0,0 +1,125 @@
+import base64
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+BucketDiff = namedtuple("BucketDiff", ["start_time", "end_time", "left_count", "right_count", "only_left", "only_right"])
+
+
+def normalize_hash(message_hash):
+    # nwaku answers with 0x prefixed hex and go-waku with base64 (which may start with "0x" too), buckets are compared in hex
+    if len(message_hash) == 66 and message_hash.startswith("0x"):
+        return message_hash
+    return "0x" + base64.b64decode(message_hash).hex()
+
+
+def time_buckets(start_time, end_time, bucket_count):
+    # consecutive, non overlapping [start, end] nanosecond ranges covering start_time..end_time
+    start_time, end_time = int(start_time), int(end_time)
+    if end_time < start_time:
+        raise ValueError(f"End time {end_time} is before start time {start_time}")
+    bucket_count = max(1, min(int(bucket_count), end_time - start_time + 1))
+    width = (end_time - start_time + 1) / bucket_count
+    bounds = [start_time + int(width * index) for index in range(bucket_count)] + [end_time + 1]
+    return [(bounds[index], bounds[index + 1] - 1) for index in range(bucket_count)]
+
+
+def bucket_fingerprint(hashes):
+    # independent of the order the store returned the hashes in
+    ctx = hashlib.sha256()
+    for message_hash in sorted(hashes):
+        ctx.update(message_hash.encode("utf-8"))
+    return ctx.hexdigest()
+
+
+class StoreRangeDiff:
+    def __init__(self, left, right, buckets, fingerprints):
+        self.left = left
+        self.right = right
+        # BucketDiff per time bucket, in time order
+        self.buckets = buckets
+        self.fingerprints = fingerprints
+        # normalized hash -> full message, filled for mismatched buckets only
+        self.left_messages = {}
+        self.right_messages = {}
+        self.hash_bytes = 0
+        self.message_bytes = 0
+
+    def mismatched(self):
+        return [bucket for bucket in self.buckets if bucket.only_left or bucket.only_right]
+
+    @property
+    def identical(self):
+        return not self.mismatched()
+
+    def only_left(self):
+        return [message_hash for bucket in self.buckets for message_hash in bucket.only_left]
+
+    def only_right(self):
+        return [message_hash for bucket in self.buckets for message_hash in bucket.only_right]
+
+    def summary(self, max_hashes=5):
+        mismatched = self.mismatched()
+        only_left, only_right = self.only_left(), self.only_right()
+        lines = [
+            f"{self.left.image} vs {self.right.image}: {len(mismatched)}/{len(self.buckets)} buckets differ, "
+            f"{len(only_left)} messages only left, {len(only_right)} only right, "
+            f"{self.hash_bytes} bytes of hashes and {self.message_bytes} bytes of messages fetched"
+        ]
+        for bucket in mismatched[:max_hashes]:
+            lines.append(
+                f"  {bucket.start_time}..{bucket.end_time}: {bucket.left_count} vs {bucket.right_count} messages, "
+                f"only left {bucket.only_left[:max_hashes]}, only right {bucket.only_right[:max_hashes]}"
+            )
+        return "\n".join(lines)
+
+
+def diff_store_ranges(left, right, start_time, end_time, fetch_hashes, fetch_messages=None, bucket_count=16, max_workers=8):
+    """
+    Diffs two stores over start_time..end_time without downloading their contents. Both are read hashes only
+    (`fetch_hashes(node, start, end)` returns the hashes and the bytes received), every time bucket of both nodes
+    at once, and buckets are compared by fingerprint. Only for buckets that differ, `fetch_messages(node, hashes)`
+    downloads the full messages missing on the other side, returning {hash: message} and the bytes received.
+    """
+    buckets = time_buckets(start_time, end_time, bucket_count)
+    jobs = [(node, bucket) for bucket in buckets for node in (left, right)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))), thread_name_prefix="store_diff") as executor:
+        fetched = list(executor.map(lambda job: fetch_hashes(job[0], *job[1]), jobs))
+        hashes = {}
+        hash_bytes = 0
+        for job, (node_hashes, received) in zip(jobs, fetched):
+            hashes[job] = {normalize_hash(message_hash): message_hash for message_hash in node_hashes}
+            hash_bytes += received
+
+        results, fingerprints = [], []
+        for bucket in buckets:
+            left_hashes, right_hashes = hashes[(left, bucket)], hashes[(right, bucket)]
+            fingerprint = (bucket_fingerprint(left_hashes), bucket_fingerprint(right_hashes))
+            fingerprints.append(fingerprint)
+            if fingerprint[0] == fingerprint[1]:
+                only_left, only_right = [], []
+            else:
+                only_left = sorted(set(left_hashes) - set(right_hashes))
+                only_right = sorted(set(right_hashes) - set(left_hashes))
+            results.append(BucketDiff(bucket[0], bucket[1], len(left_hashes), len(right_hashes), only_left, only_right))
+
+        diff = StoreRangeDiff(left, right, results, fingerprints)
+        diff.hash_bytes = hash_bytes
+        if fetch_messages is not None and not diff.identical:
+            # lookups use the encoding each node answered with
+            wanted = []
+            for bucket in diff.mismatched():
+                window = (bucket.start_time, bucket.end_time)
+                if bucket.only_left:
+                    wanted.append((left, [hashes[(left, window)][message_hash] for message_hash in bucket.only_left]))
+                if bucket.only_right:
+                    wanted.append((right, [hashes[(right, window)][message_hash] for message_hash in bucket.only_right]))
+            for (node, _), (messages, received) in zip(wanted, executor.map(lambda item: fetch_messages(*item), wanted)):
+                target = diff.left_messages if node is left else diff.right_messages
+                target.update({normalize_hash(message_hash): message for message_hash, message in messages.items()})
+                diff.message_bytes += received
+    logger.debug(f"Store range diff:\n{diff.summary()}")
+    return diff
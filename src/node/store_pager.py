@@ -0,0 +1,80 @@
+import asyncio
+from time import perf_counter
+from src.libs.custom_logger import get_custom_logger
+from src.node.api_clients.async_base_client import get_event_loop
+from src.node.store_response import StoreResponse
+
+logger = get_custom_logger(__name__)
+
+
+class StorePager:
+    """
+    Walks all pages of one store query. The request for the next page is already running on the async
+    REST loop while the caller works on the current one, so a full dump costs about the slower of network
+    and verification per page instead of both. Leaving the iteration early cancels the prefetched request.
+    `build_page` turns the JSON of a page into a StoreResponse and may check it on the way.
+    """
+
+    def __init__(self, node, page_size=100, max_pages=None, build_page=None, **query):
+        self._node = node
+        self._cursor = query.pop("cursor", None)
+        self._query = dict(query, page_size=page_size)
+        self._max_pages = max_pages
+        self._build_page = build_page or StoreResponse
+        self.pages_fetched = 0
+        self.messages_received = 0
+        self.bytes_received = 0
+        self.page_seconds = []
+        # time the consumer actually stood still for a page, what the prefetch didn't hide
+        self.wait_seconds = 0.0
+
+    async def _fetch(self, cursor):
+        started = perf_counter()
+        response = await self._node.get_store_messages_async(cursor=cursor, raw_response=True, **self._query)
+        return response, perf_counter() - started
+
+    def _request(self, cursor):
+        return asyncio.run_coroutine_threadsafe(self._fetch(cursor), get_event_loop())
+
+    def pages(self):
+        pending = self._request(self._cursor)
+        try:
+            while pending is not None:
+                waiting_since = perf_counter()
+                response, seconds = pending.result()
+                self.wait_seconds += perf_counter() - waiting_since
+                pending = None
+                page = self._build_page(response.json(), self._node)
+                self.pages_fetched += 1
+                self.messages_received += len(page.messages or [])
+                self.bytes_received += len(response.content)
+                self.page_seconds.append(seconds)
+                if page.pagination_cursor is not None and (self._max_pages is None or self.pages_fetched < self._max_pages):
+                    pending = self._request(page.pagination_cursor)
+                yield page
+        finally:
+            if pending is not None:
+                pending.cancel()
+            logger.debug(f"Store pages of {self._node.image}: {self.summary()}")
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page.messages or []
+
+    def message_hashes(self):
+        for page in self.pages():
+            yield from page.message_hashes or []
+
+    def stats(self):
+        return {
+            "pages": self.pages_fetched,
+            "messages": self.messages_received,
+            "bytes": self.bytes_received,
+            "seconds": round(sum(self.page_seconds), 3),
+            "max_page_seconds": round(max(self.page_seconds, default=0), 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return f"{stats['messages']} messages in {stats['pages']} pages, {stats['bytes']} bytes, {stats['seconds']}s fetching, {stats['wait_seconds']}s waited for"
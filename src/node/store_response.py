@@ -1,103 +1,109 @@
+import base64
+from collections import namedtuple
+
+StoreFields = namedtuple("StoreFields", ["request_id", "status_code", "status_desc", "pagination_cursor", "message_hash", "pubsub_topic"])
+
+# nwaku answers in camelCase, go-waku in snake_case
+NWAKU_FIELDS = StoreFields("requestId", "statusCode", "statusDesc", "paginationCursor", "messageHash", "pubsubTopic")
+GOWAKU_FIELDS = StoreFields("request_id", "status_code", "status_desc", "pagination_cursor", "message_hash", "pubsub_topic")
+
+
 class StoreResponse:
+    """
+    One page of a store query. The field names of the node are resolved once when the page is built and
+    the hashes are collected in the same pass, so checking thousands of messages never goes back to the
+    node type. Payloads, timestamps and decoded bodies are only extracted when asked for.
+    """
+
+    __slots__ = (
+        "response",
+        "node",
+        "request_id",
+        "status_code",
+        "status_desc",
+        "pagination_cursor",
+        "messages",
+        "message_hashes",
+        "_fields",
+        "_payloads",
+        "_decoded_payloads",
+    )
+
     def __init__(self, store_response, node):
         self.response = store_response
         self.node = node
+        self._fields = NWAKU_FIELDS if node.is_nwaku() else GOWAKU_FIELDS
+        page = store_response if isinstance(store_response, dict) else {}
+        self.request_id = page.get(self._fields.request_id)
+        self.status_code = page.get(self._fields.status_code)
+        self.status_desc = page.get(self._fields.status_desc)
+        self.pagination_cursor = page.get(self._fields.pagination_cursor)
+        self.messages = page.get("messages")
+        hash_field = self._fields.message_hash
+        self.message_hashes = None if self.messages is None else tuple(message.get(hash_field) for message in self.messages)
+        self._payloads = None
+        self._decoded_payloads = None
 
     @property
-    def request_id(self):
-        try:
-            if self.node.is_nwaku():
-                return self.response.get("requestId")
-            else:
-                return self.response.get("request_id")
-        except:
+    def resp_json(self):
+        return self.response
+
+    def _message_field(self, name):
+        # messages queried with include_data=false carry no body
+        if self.messages is None:
             return None
+        return tuple((message.get("message") or {}).get(name) for message in self.messages)
 
     @property
-    def status_code(self):
-        try:
-            if self.node.is_nwaku():
-                return self.response.get("statusCode")
-            else:
-                return self.response.get("status_code")
-        except:
-            return None
+    def payloads(self):
+        if self._payloads is None:
+            self._payloads = self._message_field("payload")
+        return self._payloads
 
     @property
-    def status_desc(self):
-        try:
-            if self.node.is_nwaku():
-                return self.response.get("statusDesc")
-            else:
-                return self.response.get("status_desc")
-        except:
-            return None
+    def content_topics(self):
+        return self._message_field("contentTopic")
 
     @property
-    def messages(self):
-        try:
-            return self.response.get("messages")
-        except:
-            return None
+    def timestamps(self):
+        return self._message_field("timestamp")
 
     @property
-    def pagination_cursor(self):
-        try:
-            if self.node.is_nwaku():
-                return self.response.get("paginationCursor")
-            else:
-                return self.response.get("pagination_cursor")
-        except:
+    def pubsub_topics(self):
+        if self.messages is None:
             return None
+        return tuple(message.get(self._fields.pubsub_topic) for message in self.messages)
+
+    @property
+    def decoded_payloads(self):
+        if self._decoded_payloads is None and self.payloads is not None:
+            self._decoded_payloads = tuple(None if payload is None else base64.b64decode(payload) for payload in self.payloads)
+        return self._decoded_payloads
 
     def message_hash(self, index):
-        if self.messages is not None:
-            if self.node.is_nwaku():
-                return self.messages[index]["messageHash"]
-            else:
-                return self.messages[index]["message_hash"]
-        else:
+        if self.message_hashes is None:
             return None
+        return self.message_hashes[index]
 
     def message_content(self, index):
-        try:
-            if self.messages is not None:
-                payload = self.messages[index]["message"]["contentTopic"]
-                return payload
-            else:
-                return None
-        except IndexError:
-            return None
+        return self._message_at(index, "contentTopic")
 
     def message_payload(self, index):
-        try:
-            if self.messages is not None:
-                payload = self.messages[index]["message"]["payload"]
-                return payload
-            else:
-                return None
-        except IndexError:
-            return None
+        return self._message_at(index, "payload")
 
     def message_at(self, index):
+        return self._message_at(index)
+
+    def _message_at(self, index, name=None):
         try:
-            if self.messages is not None:
-                message = self.messages[index]["message"]
-                return message
-            else:
+            if self.messages is None:
                 return None
+            message = self.messages[index]["message"]
+            return message if name is None else message[name]
         except IndexError:
             return None
 
     def message_pubsub_topic(self, index):
-        if self.messages is not None:
-            if self.node.is_nwaku():
-                return self.messages[index]["pubsubTopic"]
-            else:
-                return self.messages[index]["pubsub_topic"]
-        else:
+        if self.messages is None:
             return None
-
-    @property
-    def resp_json(self):
-        return self.response
+        return self.messages[index][self._fields.pubsub_topic]
@@ -0,0 +1,115 @@
+import asyncio
+from time import time
+from src.libs.custom_logger import get_custom_logger
+from src.node.bulk_publisher import publish_messages
+
+logger = get_custom_logger(__name__)
+
+# nwaku answers at most 100 messages per store page, so one hash lookup confirms up to 100 messages
+LOOKUP_BATCH_SIZE = 100
+
+
+class SeedReport:
+    def __init__(self, messages, results, publish_seconds, target_rate=None):
+        self.messages = messages
+        # PublishResult per message, in the order of `messages`
+        self.results = results
+        self.publish_seconds = publish_seconds
+        self.target_rate = target_rate
+        # store node -> messages accepted for publishing but not found in its store
+        self.missing = {}
+        self.confirm_seconds = 0.0
+
+    @property
+    def accepted(self):
+        return [result.message for result in self.results if result.error is None]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if result.error is not None]
+
+    @property
+    def acceptance_ratio(self):
+        return len(self.accepted) / len(self.results) if self.results else 1.0
+
+    @property
+    def publish_rate(self):
+        return len(self.results) / self.publish_seconds if self.publish_seconds else 0.0
+
+    @property
+    def confirmed(self):
+        return not any(self.missing.values())
+
+    def as_dict(self):
+        return {
+            "messages": len(self.results),
+            "accepted": len(self.accepted),
+            "acceptance_ratio": round(self.acceptance_ratio, 4),
+            "target_rate": self.target_rate,
+            "publish_rate": round(self.publish_rate, 1),
+            "publish_seconds": round(self.publish_seconds, 3),
+            "confirm_seconds": round(self.confirm_seconds, 3),
+            "missing": {node.image: len(missing) for node, missing in self.missing.items()},
+        }
+
+    def summary(self):
+        line = f"{len(self.accepted)}/{len(self.results)} messages accepted ({self.acceptance_ratio:.1%}) at {self.publish_rate:.1f} msg/s"
+        if self.target_rate:
+            line += f" (target {self.target_rate} msg/s)"
+        line += f" in {self.publish_seconds:.2f}s"
+        if self.missing:
+            line += f", stored after {self.confirm_seconds:.2f}s, missing per store: {self.as_dict()['missing']}"
+        if self.failed:
+            line += f", first error: {self.failed[0].error}"
+        return line
+
+
+async def publish_from_senders(senders, messages, via="relay", pubsub_topic=None, workers=16, rate=None):
+    """
+    Splits `messages` round robin over `senders` and publishes through all of them at once, each with
+    `workers` requests in flight and its share of the overall `rate`. Returns one SeedReport.
+    """
+    parts = [messages[index :: len(senders)] for index in range(len(senders))]
+    sender_rate = rate / len(senders) if rate else None
+    started = time()
+    published = await asyncio.gather(
+        *(publish_messages(sender, part, via, pubsub_topic, concurrency=workers, rate=sender_rate) for sender, part in zip(senders, parts))
+    )
+    publish_seconds = time() - started
+    results = [None] * len(messages)
+    for offset, sender_results in enumerate(published):
+        for result in sender_results:
+            index = offset + result.index * len(senders)
+            results[index] = result._replace(index=index)
+    return SeedReport(messages, results, publish_seconds, rate)
+
+
+async def confirm_stored(lookup, hashes, timeout=60, batch_size=LOOKUP_BATCH_SIZE, concurrency=8, first_wait=0.2, max_wait=2):
+    """
+    Polls a store with batched hash lookups until every hash of `hashes` is found or `timeout` passes.
+    `lookup(batch)` is a coroutine returning the hashes of `batch` the store has. Found hashes are not
+    looked up again, so each round only costs what is still missing. Returns the hashes never found.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = list(dict.fromkeys(hashes))
+    pause = first_wait
+
+    async def lookup_batch(batch):
+        async with semaphore:
+            try:
+                return set(await lookup(batch))
+            except Exception as ex:
+                logger.debug(f"Hash lookup of {len(batch)} messages failed, will retry: {ex}")
+                return set()
+
+    while pending:
+        batches = [pending[index : index + batch_size] for index in range(0, len(pending), batch_size)]
+        found = set().union(*await asyncio.gather(*(lookup_batch(batch) for batch in batches)))
+        pending = [message_hash for message_hash in pending if message_hash not in found]
+        if not pending or loop.time() >= deadline:
+            break
+        await asyncio.sleep(min(pause, max(0, deadline - loop.time())))
+        pause = min(pause * 2, max_wait)
+    return pending
@@ -0,0 +1,64 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from src.libs.custom_logger import get_custom_logger
+
+logger = get_custom_logger(__name__)
+
+# counters nwaku keeps for the store sync protocols (reconciliation and transfer), labelled by protocol and direction
+SYNC_BYTES_METRICS = ["total_bytes_exchanged"]
+
+Convergence = namedtuple("Convergence", ["converged_after", "polls", "missing"])
+
+
+def metric_total(metrics_text, names=SYNC_BYTES_METRICS):
+    # sum over every labelled sample of the given prometheus counters
+    total = 0.0
+    for line in metrics_text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, _, rest = line.partition("{")
+        if "}" in rest:
+            rest = rest.split("}", 1)[1]
+        else:
+            name, _, rest = line.partition(" ")
+        # value is the first field after the labels, an optional timestamp may follow
+        if name.strip() in names and rest.split():
+            total += float(rest.split()[0])
+    return total
+
+
+def wait_for_convergence(nodes, reference_hashes, fetch_hashes, timeout=60, first_wait=0.1, max_wait=2):
+    """
+    Polls the stores of all `nodes` at once until each holds every hash of `reference_hashes(node)`;
+    `fetch_hashes(node)` returns the set a node has right now. A node is only polled until it converges and
+    its convergence time is measured from the call, nodes still missing messages at `timeout` get None.
+    """
+    started = monotonic()
+    results = {}
+    polls = {node: 0 for node in nodes}
+    pending = list(nodes)
+    pause = first_wait
+    with ThreadPoolExecutor(max_workers=len(nodes) or 1, thread_name_prefix="store_sync") as executor:
+        while pending:
+            fetched = list(executor.map(fetch_hashes, pending))
+            elapsed = monotonic() - started
+            still_pending = []
+            for node, hashes in zip(pending, fetched):
+                polls[node] += 1
+                missing = len(reference_hashes(node) - hashes)
+                if missing:
+                    still_pending.append(node)
+                    results[node] = Convergence(None, polls[node], missing)
+                else:
+                    results[node] = Convergence(round(elapsed, 3), polls[node], 0)
+                    logger.debug(f"Store of {node.image} converged after {elapsed:.3f}s and {polls[node]} polls")
+            pending = still_pending
+            if pending:
+                remaining = timeout - (monotonic() - started)
+                if remaining <= 0:
+                    logger.error(f"{len(pending)} stores did not converge in {timeout}s: {[(node.image, results[node].missing) for node in pending]}")
+                    break
+                sleep(min(pause, remaining))
+                pause = min(pause * 2, max_wait)
+    return results
@@ -0,0 +1,116 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from src.libs.custom_logger import get_custom_logger
+from src.node.waku_node import WakuNode
+
+logger = get_custom_logger(__name__)
+
+
+class NodeRef:
+    # placeholder for a start flag that can only be resolved once another node of the cluster is up
+    def __init__(self, name, accessor):
+        self.name = name
+        self.accessor = accessor
+
+    def resolve(self, started_nodes):
+        return self.accessor(started_nodes[self.name])
+
+
+def enr_of(name):
+    return NodeRef(name, lambda node: node.get_enr_uri())
+
+
+def multiaddr_of(name):
+    return NodeRef(name, lambda node: node.get_multiaddr_with_id())
+
+
+class NodeSpec:
+    def __init__(self, name, image, log_prefix=None, bootstrap=None, wait_for_node_sec=20, **kwargs):
+        self.name = name
+        self.image = image
+        self.log_prefix = log_prefix if log_prefix is not None else name
+        self.wait_for_node_sec = wait_for_node_sec
+        self.kwargs = kwargs
+        if bootstrap is not None:
+            self.kwargs["discv5_bootstrap_node"] = enr_of(bootstrap)
+
+    def dependencies(self):
+        deps = set()
+        for value in self.kwargs.values():
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, NodeRef):
+                    deps.add(item.name)
+        return deps
+
+    def resolve_kwargs(self, started_nodes):
+        resolved = {}
+        for key, value in self.kwargs.items():
+            if isinstance(value, list):
+                resolved[key] = [item.resolve(started_nodes) if isinstance(item, NodeRef) else item for item in value]
+            elif isinstance(value, NodeRef):
+                resolved[key] = value.resolve(started_nodes)
+            else:
+                resolved[key] = value
+        return resolved
+
+
+class WakuCluster:
+    """
+    Starts a group of nodes concurrently. Nodes that depend on other nodes (ENR bootstrap, storenode etc.)
+    are started as soon as all of their dependencies are ready, so the setup time follows the depth
+    of the dependency chain instead of the number of nodes.
+    """
+
+    def __init__(self, max_workers=8):
+        self._max_workers = max_workers
+
+    def start_all(self, specs, existing=None):
+        started_nodes = dict(existing or {})
+        pending = {spec.name: spec for spec in specs}
+        if len(pending) != len(specs):
+            raise ValueError("Node spec names need to be unique")
+        self._check_dependencies(pending, started_nodes)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self._max_workers, len(specs)))) as executor:
+            running = {}
+            while pending or running:
+                for name, spec in list(pending.items()):
+                    if spec.dependencies().issubset(started_nodes):
+                        running[executor.submit(self._start_node, spec, started_nodes)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        started_nodes[name] = future.result()
+                    except Exception as ex:
+                        for other in running:
+                            other.cancel()
+                        logger.error(f"Node {name} failed to start, aborting cluster start: {ex}")
+                        raise
+
+        return [started_nodes[spec.name] for spec in specs]
+
+    def _start_node(self, spec, started_nodes):
+        node = WakuNode(spec.image, spec.log_prefix)
+        node.start(wait_for_node_sec=spec.wait_for_node_sec, **spec.resolve_kwargs(started_nodes))
+        logger.debug(f"Cluster node {spec.name} started from image {spec.image}")
+        return node
+
+    def _check_dependencies(self, pending, started_nodes):
+        known = set(pending) | set(started_nodes)
+        for spec in pending.values():
+            unknown = spec.dependencies() - known
+            if unknown:
+                raise ValueError(f"Node spec {spec.name} depends on unknown nodes {sorted(unknown)}")
+
+        # Kahn's algorithm, only used to reject cycles before anything is started
+        resolved = set(started_nodes)
+        remaining = dict(pending)
+        while remaining:
+            ready = [name for name, spec in remaining.items() if spec.dependencies().issubset(resolved)]
+            if not ready:
+                raise ValueError(f"Cyclic dependency between node specs {sorted(remaining)}")
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
@@ -5,16 +5,26 @@ import random
 import re
 import shutil
 import string
+from time import time
 import pytest
 import requests
-from src.libs.common import delay
+from docker.errors import NotFound
 from src.libs.custom_logger import get_custom_logger
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.libs.retrying import retry_with_backoff
+from src.node.api_clients.async_base_client import run_async
+from src.node.api_clients.async_rest import AsyncREST
 from src.node.api_clients.rest import REST
 from src.node.docker_mananger import DockerManager
 from src.env_vars import DOCKER_LOG_DIR
 from src.data_storage import DS
-from src.test_data import DEFAULT_CLUSTER_ID, LOG_ERROR_KEYWORDS, VALID_PUBSUB_TOPICS
+from src.node.bulk_publisher import publish_messages
+from src.node.crash_watchdog import CrashWatchdog
+from src.node.docker_events import get_docker_event_bus
+from src.node.log_index import LogIndex
+from src.node.log_scanner import MAX_LINES_PER_PATTERN, get_log_scanner
+from src.node.store_pager import StorePager
+from src.node.node_readiness import StartupWatcher
+from src.test_data import DEFAULT_CLUSTER_ID, LOG_ERROR_KEYWORDS, NODE_STARTUP_LOG_MARKERS, VALID_PUBSUB_TOPICS
 
 logger = get_custom_logger(__name__)
 
@@ -36,7 +46,7 @@ def sanitize_docker_flags(input_flags):
     return output_flags
 
 
-@retry(stop=stop_after_delay(180), wait=wait_fixed(0.5), reraise=True)
+@retry_with_backoff(timeout=180, max_wait=0.5)
 def rln_credential_store_ready(creds_file_path, single_check=False):
     if os.path.exists(creds_file_path):
         return True
@@ -61,6 +71,13 @@ def multiaddr2id(multiaddr):
     return multiaddr.split("/")[-1]
 
 
+def topics_to_track(topics):
+    # negative tests send all kinds of invalid values, only plain topic strings are worth remembering
+    if not isinstance(topics, list):
+        return []
+    return [topic for topic in topics if isinstance(topic, str)]
+
+
 def resolve_sharding_flags(kwargs):
     if "pubsub_topic" in kwargs:
         pubsub_topic = kwargs["pubsub_topic"]
@@ -82,20 +99,38 @@ class WakuNode:
         self._log_path = os.path.join(DOCKER_LOG_DIR, f"{docker_log_prefix}__{self._image_name.replace('/', '_')}.log")
         self._docker_manager = DockerManager(self._image_name)
         self._container = None
+        self._lease = None
+        self._startup = None
+        self._log_index = None
+        self._watchdog = None
+        # pooled nodes are owned by the NodePool and are not stopped by the per test teardown
+        self.pooled = False
+        self._relay_subscriptions = set()
+        self._relay_auto_subscriptions = set()
+        self._filter_subscribed = False
         logger.debug(f"WakuNode instance initialized with log path {self._log_path}")
 
-    @retry(stop=stop_after_delay(60), wait=wait_fixed(0.1), reraise=True)
+    @retry_with_backoff(timeout=60, max_wait=1)
     def start(self, wait_for_node_sec=20, **kwargs):
+        try:
+            self._start_attempt(wait_for_node_sec, **kwargs)
+        except Exception:
+            self.discard_failed_start()
+            raise
+
+    def _start_attempt(self, wait_for_node_sec, **kwargs):
         logger.debug("Starting Node...")
         self._docker_manager.create_network()
         self._ext_ip = self._docker_manager.generate_random_ext_ip()
         self._ports = self._docker_manager.generate_ports()
+        self._lease = (self._ports, self._ext_ip)
         self._rest_port = self._ports[0]
         self._tcp_port = self._ports[1]
         self._websocket_port = self._ports[2]
         self._discv5_port = self._ports[3]
         self._metrics_port = self._ports[4]
-        self._api = REST(self._rest_port)
+        self._api = REST(self._rest_port, self._image_name)
+        self._async_api = AsyncREST(self._rest_port, self._metrics_port, self._image_name)
         self._volumes = []
 
         default_args = {
@@ -169,6 +204,12 @@ class WakuNode:
 
         logger.debug(f"Using volumes {self._volumes}")
 
+        self._startup = StartupWatcher(NODE_STARTUP_LOG_MARKERS[self.type()])
+        # a fresh container starts a fresh log file, the error keywords ride along with every later log search
+        log_scanner = get_log_scanner(self._log_path)
+        log_scanner.reset()
+        log_scanner.register(LOG_ERROR_KEYWORDS, max_lines=MAX_LINES_PER_PATTERN)
+        self._log_index = LogIndex(self._log_path, self.type())
         self._container = self._docker_manager.start_container(
             self._docker_manager.image,
             ports=self._ports,
@@ -177,77 +218,138 @@ class WakuNode:
             container_ip=self._ext_ip,
             volumes=self._volumes,
             remove_container=remove_container,
+            log_listeners=[self._startup.on_log_chunk, self._log_index.on_log_chunk],
         )
+        self._startup.record("container_created")
 
         logger.debug(f"Started container from image {self._image_name}. REST: {self._rest_port}")
-        DS.waku_nodes.append(self)
-        delay(1)  # if we fire requests to soon after starting the node will sometimes fail to start correctly
+        if not self.pooled:
+            DS.waku_nodes.append(self)
+        # no fixed sleep here, ensure_ready holds the REST calls back until the node announces its REST server
+        event_bus = get_docker_event_bus()
+        event_bus.subscribe(self._container.id, self._startup.on_docker_event)
         try:
             self.ensure_ready(timeout_duration=wait_for_node_sec)
         except Exception as ex:
             logger.error(f"REST service did not become ready in time: {ex}")
             raise
-
-    @retry(stop=stop_after_delay(250), wait=wait_fixed(0.1), reraise=True)
+        finally:
+            event_bus.unsubscribe(self._container.id, self._startup.on_docker_event)
+        logger.info(f"Start up timeline of {self._image_name}: {self._startup.summary()}")
+        self._watchdog = CrashWatchdog(self._container, self._image_name, self._log_path)
+        self._watchdog.watch()
+        self._api.watchdog = self._watchdog
+        self._async_api.watchdog = self._watchdog
+
+    @retry_with_backoff(timeout=250, max_wait=2)
     def register_rln(self, **kwargs):
         logger.debug("Registering RLN credentials...")
         self._docker_manager.create_network()
         self._ext_ip = self._docker_manager.generate_random_ext_ip()
         self._ports = self._docker_manager.generate_ports()
-        self._rest_port = self._ports[0]
-        self._api = REST(self._rest_port)
-        self._volumes = []
+        self._lease = (self._ports, self._ext_ip)
+        try:
+            self._rest_port = self._ports[0]
+            self._api = REST(self._rest_port, self._image_name)
+            self._async_api = AsyncREST(self._rest_port, image=self._image_name)
+            self._volumes = []
 
-        default_args = {"rln-creds-id": None, "rln-creds-source": None, "rln-relay-user-message-limit-registration": 100}
+            default_args = {"rln-creds-id": None, "rln-creds-source": None, "rln-relay-user-message-limit-registration": 100}
 
-        default_args.update(sanitize_docker_flags(kwargs))
+            default_args.update(sanitize_docker_flags(kwargs))
 
-        rln_args, rln_creds_set, keystore_path = self.parse_rln_credentials(default_args, True)
+            rln_args, rln_creds_set, keystore_path = self.parse_rln_credentials(default_args, True)
 
-        if rln_creds_set:
-            self._container = self._docker_manager.start_container(
-                self._docker_manager.image, self._ports, rln_args, self._log_path, self._ext_ip, self._volumes
-            )
+            if rln_creds_set:
+                self._container = self._docker_manager.start_container(
+                    self._docker_manager.image, self._ports, rln_args, self._log_path, self._ext_ip, self._volumes
+                )
 
-            logger.debug(f"Executed container from image {self._image_name}. REST: {self._rest_port} to register RLN")
+                logger.debug(f"Executed container from image {self._image_name}. REST: {self._rest_port} to register RLN")
 
-            logger.debug(f"Waiting for keystore {keystore_path}")
-            try:
-                rln_credential_store_ready(keystore_path)
-            except Exception as ex:
-                logger.error(f"File {keystore_path} with RLN credentials did not become available in time {ex}")
-                raise
-        else:
-            logger.warn("RLN credentials not set, no action performed")
+                logger.debug(f"Waiting for keystore {keystore_path}")
+                try:
+                    rln_credential_store_ready(keystore_path)
+                except Exception as ex:
+                    logger.error(f"File {keystore_path} with RLN credentials did not become available in time {ex}")
+                    raise
+            else:
+                logger.warn("RLN credentials not set, no action performed")
+        finally:
+            # the registration container is done with its ports once the keystore is written or the attempt failed
+            self.release_ports_and_ip()
 
-    @retry(stop=stop_after_delay(5), wait=wait_fixed(0.1), reraise=True)
+    @retry_with_backoff(timeout=5, max_wait=0.1)
     def stop(self):
+        self._shut_down(self._container.stop if self._container else None, "Stopping", "stopped")
+
+    @retry_with_backoff(timeout=5, max_wait=0.1)
+    def kill(self):
+        self._shut_down(self._container.kill if self._container else None, "Killing", "killed")
+
+    def _shut_down(self, action, doing, done):
+        # a container the watchdog saw die is still removed, then the crash is raised so teardown fails the test
         if self._container:
-            logger.debug(f"Stopping container with id {self._container.short_id}")
-            self._container.stop()
+            logger.debug(f"{doing} container with id {self._container.short_id}")
+            watchdog = self.stop_watching()
+            if watchdog is None or not watchdog.crashed:
+                action()
             try:
                 self._container.remove()
-            except:
+            except NotFound:
                 pass
             self._container = None
-            logger.debug("Container stopped.")
+            self.release_ports_and_ip()
+            self._api.close()
+            self._async_api.close()
+            logger.debug(f"Container {done}.")
+            if watchdog is not None:
+                watchdog.raise_if_crashed()
+
+    def stop_watching(self):
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is None:
+            return None
+        watchdog.unwatch()
+        if watchdog.crashed:
+            logger.error(f"Container with id {self._container.short_id} {watchdog.reason} during the test")
+        return watchdog
 
-    @retry(stop=stop_after_delay(5), wait=wait_fixed(0.1), reraise=True)
-    def kill(self):
-        if self._container:
-            logger.debug(f"Killing container with id {self._container.short_id}")
-            self._container.kill()
+    @property
+    def crashed(self):
+        return self._watchdog is not None and self._watchdog.crashed
+
+    def discard_failed_start(self):
+        # a failed attempt must neither leave its container running nor keep its lease when the next attempt takes a new one
+        if self._container is not None:
             try:
-                self._container.remove()
-            except:
-                pass
+                self._container.remove(force=True)
+            except Exception as ex:
+                logger.debug(f"Could not remove container {self._container.short_id} of a failed start: {ex}")
+            if self in DS.waku_nodes:
+                DS.waku_nodes.remove(self)
             self._container = None
-            logger.debug("Container killed.")
+        self.release_ports_and_ip()
+
+    def release_ports_and_ip(self):
+        # the addresses stay readable on the node, only the lease goes back to the allocator
+        if self._lease is not None:
+            self._docker_manager.release_ports_and_ip(*self._lease)
+            self._lease = None
 
     def restart(self):
         if self._container:
             logger.debug(f"Restarting container with id {self._container.short_id}")
-            self._container.restart()
+            if self._watchdog is None:
+                self._container.restart()
+            else:
+                with self._watchdog.expected_exit():
+                    self._container.restart()
+            # keep-alive connections went down with the old process
+            self._api.close()
+            self._async_api.close()
+            if self._startup:
+                self._startup.reset()
 
     def pause(self):
         if self._container:
@@ -260,35 +362,46 @@ class WakuNode:
             self._container.unpause()
 
     def ensure_ready(self, timeout_duration=10):
-        @retry(stop=stop_after_delay(timeout_duration), wait=wait_fixed(0.1), reraise=True)
-        def check_healthy(node=self):
-            self.health_response = node.health()
-            if self.health_response == b"Node is healthy":
-                logger.info("Node is healthy !!")
-                return
+        deadline = time() + timeout_duration
+        if self._startup is None:
+            self._startup = StartupWatcher({})
 
-            try:
-                self.health_response = json.loads(self.health_response)
-            except Exception as ex:
-                raise AttributeError(f"Unknown health response format {ex}")
+        if self.is_nwaku():
+            self._startup.wait_for("rest_up", self.health, deadline)
+            self._startup.wait_for("health_ready", self.check_healthy, deadline)
+        self._startup.wait_for("rest_up", self.check_ready, deadline)
+
+    def check_healthy(self):
+        self.health_response = self.health()
+        if self.health_response == b"Node is healthy":
+            logger.info("Node is healthy !!")
+            return True
 
-            if self.health_response.get("nodeHealth") != "Ready":
-                raise AssertionError("Waiting for the node health status: Ready")
+        try:
+            self.health_response = json.loads(self.health_response)
+        except Exception as ex:
+            raise AttributeError(f"Unknown health response format {ex}")
 
-            for p in self.health_response.get("protocolsHealth"):
-                if p.get("Rln Relay") != "Ready":
-                    raise AssertionError("Waiting for the Rln relay status: Ready")
+        if self.health_response.get("nodeHealth") != "Ready":
+            raise AssertionError("Waiting for the node health status: Ready")
 
-            logger.info("Node protocols are initialized !!")
+        for p in self.health_response.get("protocolsHealth"):
+            if p.get("Rln Relay") != "Ready":
+                raise AssertionError("Waiting for the Rln relay status: Ready")
+        if self.health_response.get("protocolsHealth"):
+            self._startup.record("rln_ready")
 
-        @retry(stop=stop_after_delay(timeout_duration), wait=wait_fixed(0.1), reraise=True)
-        def check_ready(node=self):
-            node.info_response = node.info()
-            logger.info("REST service is ready !!")
+        logger.info("Node protocols are initialized !!")
+        return True
 
-        if self.is_nwaku():
-            check_healthy()
-        check_ready()
+    def check_ready(self):
+        self.info_response = self.info()
+        logger.info("REST service is ready !!")
+        return True
+
+    @property
+    def startup_timeline(self):
+        return self._startup.timeline if self._startup else {}
 
     def get_id(self):
         try:
@@ -328,16 +441,24 @@ class WakuNode:
         return self._api.add_peers(peers)
 
     def set_relay_subscriptions(self, pubsub_topics):
-        return self._api.set_relay_subscriptions(pubsub_topics)
+        response = self._api.set_relay_subscriptions(pubsub_topics)
+        self._relay_subscriptions.update(topics_to_track(pubsub_topics))
+        return response
 
     def set_relay_auto_subscriptions(self, content_topics):
-        return self._api.set_relay_auto_subscriptions(content_topics)
+        response = self._api.set_relay_auto_subscriptions(content_topics)
+        self._relay_auto_subscriptions.update(topics_to_track(content_topics))
+        return response
 
     def delete_relay_subscriptions(self, pubsub_topics):
-        return self._api.delete_relay_subscriptions(pubsub_topics)
+        response = self._api.delete_relay_subscriptions(pubsub_topics)
+        self._relay_subscriptions.difference_update(topics_to_track(pubsub_topics))
+        return response
 
     def delete_relay_auto_subscriptions(self, content_topics):
-        return self._api.delete_relay_auto_subscriptions(content_topics)
+        response = self._api.delete_relay_auto_subscriptions(content_topics)
+        self._relay_auto_subscriptions.difference_update(topics_to_track(content_topics))
+        return response
 
     def send_relay_message(self, message, pubsub_topic):
         return self._api.send_relay_message(message, pubsub_topic)
@@ -355,7 +476,9 @@ class WakuNode:
         return self._api.get_relay_auto_messages(content_topic)
 
     def set_filter_subscriptions(self, subscription):
-        return self._api.set_filter_subscriptions(subscription)
+        response = self._api.set_filter_subscriptions(subscription)
+        self._filter_subscribed = True
+        return response
 
     def update_filter_subscriptions(self, subscription):
         return self._api.update_filter_subscriptions(subscription)
@@ -410,10 +533,116 @@ class WakuNode:
         else:
             pytest.skip(f"This method doesn't exist for node {self.type()}")
 
+    def publish_many(self, messages, via="relay", pubsub_topic=None, concurrency=16, rate=None, ordered=False):
+        return run_async(publish_messages(self, messages, via, pubsub_topic, concurrency, rate, ordered))
+
+    # async counterparts of the REST calls, meant to be gathered across nodes with src.node.api_clients.async_base_client.gather
+    async def info_async(self):
+        return await self._async_api.info()
+
+    async def health_async(self):
+        return await self._async_api.health()
+
+    async def get_peers_async(self):
+        return await self._async_api.get_peers()
+
+    async def add_peers_async(self, peers):
+        return await self._async_api.add_peers(peers)
+
+    async def set_relay_subscriptions_async(self, pubsub_topics):
+        response = await self._async_api.set_relay_subscriptions(pubsub_topics)
+        self._relay_subscriptions.update(topics_to_track(pubsub_topics))
+        return response
+
+    async def set_relay_auto_subscriptions_async(self, content_topics):
+        response = await self._async_api.set_relay_auto_subscriptions(content_topics)
+        self._relay_auto_subscriptions.update(topics_to_track(content_topics))
+        return response
+
+    async def delete_relay_subscriptions_async(self, pubsub_topics):
+        response = await self._async_api.delete_relay_subscriptions(pubsub_topics)
+        self._relay_subscriptions.difference_update(topics_to_track(pubsub_topics))
+        return response
+
+    async def delete_relay_auto_subscriptions_async(self, content_topics):
+        response = await self._async_api.delete_relay_auto_subscriptions(content_topics)
+        self._relay_auto_subscriptions.difference_update(topics_to_track(content_topics))
+        return response
+
+    async def send_relay_message_async(self, message, pubsub_topic):
+        return await self._async_api.send_relay_message(message, pubsub_topic)
+
+    async def send_relay_auto_message_async(self, message):
+        return await self._async_api.send_relay_auto_message(message)
+
+    async def send_light_push_message_async(self, payload):
+        return await self._async_api.send_light_push_message(payload)
+
+    async def get_relay_messages_async(self, pubsub_topic):
+        return await self._async_api.get_relay_messages(pubsub_topic)
+
+    async def get_relay_auto_messages_async(self, content_topic):
+        return await self._async_api.get_relay_auto_messages(content_topic)
+
+    async def set_filter_subscriptions_async(self, subscription):
+        response = await self._async_api.set_filter_subscriptions(subscription)
+        self._filter_subscribed = True
+        return response
+
+    async def delete_all_filter_subscriptions_async(self, request_id):
+        return await self._async_api.delete_all_filter_subscriptions(request_id)
+
+    async def get_filter_messages_async(self, content_topic, pubsub_topic=None):
+        return await self._async_api.get_filter_messages(content_topic, pubsub_topic)
+
+    async def get_store_messages_async(
+        self,
+        peer_addr=None,
+        include_data=None,
+        pubsub_topic=None,
+        content_topics=None,
+        start_time=None,
+        end_time=None,
+        hashes=None,
+        cursor=None,
+        page_size=None,
+        ascending=None,
+        store_v="v3",
+        **kwargs,
+    ):
+        return await self._async_api.get_store_messages(
+            peer_addr=peer_addr,
+            include_data=include_data,
+            pubsub_topic=pubsub_topic,
+            content_topics=content_topics,
+            start_time=start_time,
+            end_time=end_time,
+            hashes=hashes,
+            cursor=cursor,
+            page_size=page_size,
+            ascending=ascending,
+            store_v=store_v,
+            **kwargs,
+        )
+
+    def iter_store(self, page_size=100, max_pages=None, **query):
+        return StorePager(self, page_size=page_size, max_pages=max_pages, **query)
+
+    async def get_metrics_async(self):
+        if self.is_nwaku():
+            metrics = await self._async_api.metrics()
+            return metrics.content.decode("utf-8")
+        else:
+            pytest.skip(f"This method doesn't exist for node {self.type()}")
+
     @property
     def image(self):
         return self._image_name
 
+    @property
+    def log_path(self):
+        return self._log_path
+
     def type(self):
         if self.is_nwaku():
             return "nwaku"
@@ -520,6 +749,18 @@ class WakuNode:
     def container(self):
         return self._container
 
+    def is_running(self):
+        return self._container is not None and self._docker_manager.is_container_running(self._container)
+
+    def reset_subscriptions(self):
+        if self._relay_subscriptions:
+            self.delete_relay_subscriptions(sorted(self._relay_subscriptions))
+        if self._relay_auto_subscriptions:
+            self.delete_relay_auto_subscriptions(sorted(self._relay_auto_subscriptions))
+        if self._filter_subscribed:
+            self.delete_all_filter_subscriptions({"requestId": "pool_reset"})
+            self._filter_subscribed = False
+
     def generate_random_nodekey(self):
         # Define the set of hexadecimal characters
         hex_chars = string.hexdigits.lower()
@@ -530,6 +771,13 @@ class WakuNode:
     def search_waku_log_for_string(self, search_pattern, use_regex=False):
         return self._docker_manager.search_log_for_keywords(self._log_path, [search_pattern], use_regex)
 
+    def query_logs(self, **criteria):
+        return self._log_index.query(**criteria)
+
+    @property
+    def log_index(self):
+        return self._log_index
+
     def check_waku_log_errors(self, whitelist=None):
         keywords = LOG_ERROR_KEYWORDS
 
@@ -537,5 +785,6 @@ class WakuNode:
         if whitelist:
             keywords = [keyword for keyword in keywords if keyword not in whitelist]
 
-        matches = self._docker_manager.search_log_for_keywords(self._log_path, keywords, False)
+        # only whether errors appear matters here, a capped search keeps a noisy log from piling up lines
+        matches = self._docker_manager.search_log_for_keywords(self._log_path, keywords, False, max_lines=MAX_LINES_PER_PATTERN)
         assert not matches, f"Found errors {matches}"
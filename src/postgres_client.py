@@ -0,0 +1,186 @@
+import base64
+import csv
+import io
+from time import time
+import psycopg2
+from src.env_vars import PG_HOST, PG_PASS, PG_PORT, PG_USER
+from src.libs.common import to_base64
+from src.libs.custom_logger import get_custom_logger
+from src.libs.message_hash import message_hash
+from src.libs.retrying import retry_with_backoff
+
+logger = get_custom_logger(__name__)
+
+MESSAGES_TABLE = "messages"
+COPY_CHUNK_SIZE = 100000
+
+
+def synthetic_messages(count, content_topic, payload_size=32, start_timestamp=None, step=1000):
+    # generated lazily so millions of rows can be streamed into COPY, timestamps are `step` ns apart
+    if start_timestamp is None:
+        start_timestamp = int(time() * 1e9)
+    for index in range(count):
+        payload = f"Message_{index}_".ljust(payload_size, "x")[:payload_size]
+        yield {"payload": to_base64(payload), "contentTopic": content_topic, "timestamp": start_timestamp + index * step}
+
+
+def message_row(pubsub_topic, message, columns):
+    """
+    One archive row as nwaku writes it: hash, payload and meta hex encoded without 0x, unquoted column
+    names lowercase. Only `columns` are filled so the row fits whichever archive schema version is running.
+    """
+    hashes = message_hash(pubsub_topic, message)
+    meta = message.get("meta")
+    values = {
+        "messagehash": hashes.hex[2:],
+        "pubsubtopic": pubsub_topic,
+        "contenttopic": message["contentTopic"],
+        "payload": to_hex_bytes(message["payload"]),
+        "version": message.get("version", 0),
+        "timestamp": message["timestamp"],
+        "storedat": message["timestamp"],
+        "meta": to_hex_bytes(meta) if meta is not None else None,
+    }
+    return [values.get(column) for column in columns]
+
+
+def to_hex_bytes(base64_value):
+    return base64.b64decode(base64_value).hex()
+
+
+class PostgresClient:
+    """
+    Direct connection to the archive database nwaku uses with --store-message-db-url, next to what
+    the REST API shows: bulk loading rows, sizes, index usage and per statement timings.
+    """
+
+    def __init__(self, host=PG_HOST, port=PG_PORT, user=PG_USER, password=PG_PASS, dbname="postgres"):
+        self._params = dict(host=host, port=int(port), user=user, password=password, dbname=dbname)
+        self._connection = None
+
+    @retry_with_backoff(timeout=60, max_wait=2)
+    def connect(self):
+        # the container accepts connections a while after it started
+        if self._connection is None or self._connection.closed:
+            self._connection = psycopg2.connect(**self._params)
+            self._connection.autocommit = True
+        return self._connection
+
+    def close(self):
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def query(self, sql, params=None):
+        with self.connect().cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description is None:
+                return []
+            names = [column.name for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def table_exists(self, table):
+        return bool(self.query("SELECT to_regclass(%s) IS NOT NULL AS present", (table,))[0]["present"])
+
+    def columns(self, table=MESSAGES_TABLE):
+        rows = self.query("SELECT column_name FROM information_schema.columns WHERE table_name = %s ORDER BY ordinal_position", (table,))
+        return [row["column_name"] for row in rows]
+
+    def row_count(self, table=MESSAGES_TABLE):
+        return self.query(f"SELECT count(*) AS rows FROM {table}")[0]["rows"]
+
+    def partitions(self, table=MESSAGES_TABLE):
+        # nwaku partitions the archive by time and only creates partitions around the current time
+        sql = """
+            SELECT child.relname AS partition, pg_get_expr(child.relpartbound, child.oid) AS bounds
+            FROM pg_inherits JOIN pg_class parent ON pg_inherits.inhparent = parent.oid JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = %s ORDER BY child.relname
+        """
+        return self.query(sql, (table,))
+
+    def copy_rows(self, table, columns, rows, chunk_size=COPY_CHUNK_SIZE):
+        # COPY in chunks of csv built in memory, a chunk at a time never holds the whole load
+        copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        loaded = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        with self.connect().cursor() as cursor:
+            for row in rows:
+                writer.writerow(row)
+                loaded += 1
+                if loaded % chunk_size == 0:
+                    buffer.seek(0)
+                    cursor.copy_expert(copy_sql, buffer)
+                    buffer.seek(0)
+                    buffer.truncate()
+            if buffer.tell():
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+        return loaded
+
+    def bulk_load_messages(self, pubsub_topic, messages, table=MESSAGES_TABLE, chunk_size=COPY_CHUNK_SIZE):
+        """
+        Writes `messages` straight into the archive with COPY, without relaying them. Their timestamps have
+        to fall into an existing partition, so load after the node started and with current timestamps.
+        Also fills messages_lookup when the running schema has it. Returns the number of rows loaded.
+        """
+        columns = [column for column in self.columns(table) if column != "id"]
+        if not columns:
+            raise Exception(f"Table {table} not found, is the node using this database?")
+        started = time()
+        with_lookup = self.table_exists("messages_lookup")
+        lookup_rows = []
+
+        def rows():
+            for message in messages:
+                row = message_row(pubsub_topic, message, columns)
+                if with_lookup:
+                    lookup_rows.append([row[columns.index("messagehash")], message["timestamp"]])
+                yield row
+
+        loaded = self.copy_rows(table, columns, rows(), chunk_size)
+        if with_lookup:
+            self.copy_rows("messages_lookup", ["messagehash", "timestamp"], lookup_rows, chunk_size)
+        logger.debug(f"Loaded {loaded} rows into {table} in {time() - started:.2f}s")
+        return loaded
+
+    def table_sizes(self):
+        sql = """
+            SELECT relname AS table, pg_total_relation_size(oid) AS total_bytes, pg_relation_size(oid) AS table_bytes,
+                pg_indexes_size(oid) AS index_bytes, reltuples::bigint AS estimated_rows
+            FROM pg_class WHERE relkind IN ('r', 'p') AND relnamespace = 'public'::regnamespace ORDER BY total_bytes DESC
+        """
+        return self.query(sql)
+
+    def index_usage(self):
+        sql = """
+            SELECT relname AS table, indexrelname AS index, idx_scan AS scans, idx_tup_read AS tuples_read, idx_tup_fetch AS tuples_fetched
+            FROM pg_stat_user_indexes ORDER BY idx_scan DESC
+        """
+        return self.query(sql)
+
+    def reset_statement_stats(self):
+        # needs postgres started with shared_preload_libraries=pg_stat_statements, see src.postgres_setup
+        self.query("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+        self.query("SELECT pg_stat_statements_reset()")
+
+    def statement_stats(self, limit=20, like=None):
+        sql = """
+            SELECT query, calls, total_exec_time AS total_ms, mean_exec_time AS mean_ms, max_exec_time AS max_ms, rows
+            FROM pg_stat_statements WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+            AND query NOT ILIKE '%%pg_stat_statements%%'
+        """
+        params = []
+        if like is not None:
+            sql += " AND query ILIKE %s"
+            params.append(f"%{like}%")
+        sql += " ORDER BY total_exec_time DESC LIMIT %s"
+        params.append(limit)
+        return self.query(sql, params)
@@ -1,7 +1,8 @@
 import docker
 import os
-from src.env_vars import NETWORK_NAME, PG_PASS, PG_USER
+from src.env_vars import NETWORK_NAME, PG_PASS, PG_PORT, PG_USER, POSTGRES_IMAGE
 from src.libs.custom_logger import get_custom_logger
+from src.node.image_cache import get_image_cache
 
 logger = get_custom_logger(__name__)
 
@@ -15,12 +16,13 @@ def start_postgres():
     client = docker.from_env()
 
     postgres_container = client.containers.run(
-        "postgres:15.4-alpine3.18",
+        get_image_cache().pinned(POSTGRES_IMAGE),
         name="postgres",
         environment=pg_env,
         volumes=volumes,
-        command="postgres",
-        ports={"5432/tcp": ("127.0.0.1", 5432)},
+        # pg_stat_statements gives the per query timings of src.postgres_client
+        command="postgres -c shared_preload_libraries=pg_stat_statements -c pg_stat_statements.track=all",
+        ports={"5432/tcp": ("127.0.0.1", int(PG_PORT))},
         restart_policy={"Name": "on-failure", "MaximumRetryCount": 5},
         healthcheck={
             "Test": ["CMD-SHELL", "pg_isready -U postgres -d postgres"],
@@ -1,18 +1,24 @@
-import base64
-import hashlib
 import inspect
 from time import time
 import allure
 import pytest
 from datetime import timedelta, datetime
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.libs.retrying import retry_with_backoff
 from src.libs.common import delay, to_base64
 from src.libs.custom_logger import get_custom_logger
+from src.libs.message_hash import message_hashes
+from src.env_vars import USE_NODE_POOL
+from src.node.api_clients.async_base_client import gather
+from src.node.node_pool import get_node_pool
+from src.node.waku_node import WakuNode
 
 logger = get_custom_logger(__name__)
 
 
 class StepsCommon:
+    # classes measuring cumulative node state (metrics) turn this off, see src.node.node_pool for the poolable flag sets
+    use_node_pool = True
+
     @pytest.fixture(scope="function", autouse=True)
     def common_setup(self):
         logger.debug(f"Running fixture setup: {inspect.currentframe().f_code.co_name}")
@@ -21,8 +27,15 @@ class StepsCommon:
         if not hasattr(self, "test_content_topic"):
             self.test_content_topic = "/test/1/default/proto"
 
+    def start_node(self, image, log_prefix, pooled=False, **kwargs):
+        if pooled and self.use_node_pool and USE_NODE_POOL == "true":
+            return get_node_pool().lease(image, **kwargs)
+        node = WakuNode(image, log_prefix)
+        node.start(**kwargs)
+        return node
+
     @allure.step
-    @retry(stop=stop_after_delay(20), wait=wait_fixed(0.5), reraise=True)
+    @retry_with_backoff(timeout=20, max_wait=0.5)
     def add_node_peer(self, node, multiaddr_list, shards=[0, 1, 2, 3, 4, 5, 6, 7, 8]):
         if node.is_nwaku():
             for multiaddr in multiaddr_list:
@@ -33,10 +46,9 @@ class StepsCommon:
                 node.add_peers(peer_info)
 
     @allure.step
-    @retry(stop=stop_after_delay(70), wait=wait_fixed(1), reraise=True)
+    @retry_with_backoff(timeout=70, max_wait=1)
     def wait_for_autoconnection(self, node_list, hard_wait=None):
-        for node in node_list:
-            get_peers = node.get_peers()
+        for get_peers in gather([node.get_peers_async() for node in node_list]):
             assert len(get_peers) >= 1
         if hard_wait:
             delay(hard_wait)
@@ -47,20 +59,12 @@ class StepsCommon:
         message.update(kwargs)
         return message
 
-    @allure.step
     def compute_message_hash(self, pubsub_topic, msg, hash_type="hex"):
-        ctx = hashlib.sha256()
-        ctx.update(pubsub_topic.encode("utf-8"))
-        ctx.update(base64.b64decode(msg["payload"]))
-        ctx.update(msg["contentTopic"].encode("utf-8"))
-        if "meta" in msg:
-            ctx.update(base64.b64decode(msg["meta"]))
-        ctx.update(int(msg["timestamp"]).to_bytes(8, byteorder="big"))
-        hash_bytes = ctx.digest()
-        if hash_type == "hex":
-            return "0x" + hash_bytes.hex()
-        else:
-            return base64.b64encode(hash_bytes).decode("utf-8")
+        # memoized and kept out of the allure steps, it runs once per message of every store check
+        return message_hashes(pubsub_topic, [msg], hash_type)[0]
+
+    def compute_message_hashes(self, pubsub_topic, messages, hash_type="hex"):
+        return message_hashes(pubsub_topic, messages, hash_type)
 
     def get_time_list_pass(self):
         ts_pass = [
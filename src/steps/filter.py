@@ -5,10 +5,12 @@ from time import time
 import pytest
 import allure
 from src.libs.common import to_base64, delay
+from src.node.api_clients.async_base_client import gather
 from src.node.waku_message import WakuMessage
 from src.env_vars import NODE_1, NODE_2, ADDITIONAL_NODES
 from src.node.waku_node import WakuNode
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.node.waku_cluster import NodeSpec, WakuCluster
+from src.libs.retrying import retry_with_backoff
 from src.steps.common import StepsCommon
 from src.test_data import VALID_PUBSUB_TOPICS
 
@@ -32,7 +34,7 @@ class StepsFilter(StepsCommon):
     @pytest.fixture(scope="function")
     def setup_main_relay_node(self):
         logger.debug(f"Running fixture setup: {inspect.currentframe().f_code.co_name}")
-        self.relay_node_start(NODE_1)
+        self.relay_node_start(NODE_1, pooled=True)
 
     @pytest.fixture(scope="function")
     def setup_main_filter_node(self):
@@ -48,7 +50,7 @@ class StepsFilter(StepsCommon):
         self.wait_for_subscriptions_on_main_nodes([self.test_content_topic])
 
     @pytest.fixture(scope="function")
-    @retry(stop=stop_after_delay(20), wait=wait_fixed(1), reraise=True)
+    @retry_with_backoff(timeout=20, max_wait=1)
     def filter_warm_up(self):
         try:
             self.ping_filter_subscriptions("1")
@@ -58,12 +60,11 @@ class StepsFilter(StepsCommon):
             else:
                 raise TimeoutError(f"WARM UP FAILED WITH: {ex}")
 
-    def relay_node_start(self, node):
-        self.node1 = WakuNode(node, f"node1_{self.test_id}")
+    def relay_node_start(self, node, pooled=False):
         start_args = {"relay": "true", "filter": "true"}
-        if self.node1.is_gowaku():
+        if "go-waku" in node:
             start_args["min_relay_peers_to_publish"] = "0"
-        self.node1.start(**start_args)
+        self.node1 = self.start_node(node, f"node1_{self.test_id}", pooled=pooled, **start_args)
         self.enr_uri = self.node1.get_enr_uri()
         self.multiaddr_with_id = self.node1.get_multiaddr_with_id()
         return self.node1
@@ -73,9 +74,18 @@ class StepsFilter(StepsCommon):
             nodes = [node.strip() for node in node_list.split(",") if node]
         else:
             pytest.skip("ADDITIONAL_NODES/node_list is empty, cannot run test")
-        for index, node in enumerate(nodes):
-            node = WakuNode(node, f"node{index + 3}_{self.test_id}")
-            node.start(relay="false", discv5_bootstrap_node=self.enr_uri, filternode=self.multiaddr_with_id)
+        specs = [
+            NodeSpec(
+                f"node{index + 3}",
+                image,
+                f"node{index + 3}_{self.test_id}",
+                relay="false",
+                discv5_bootstrap_node=self.enr_uri,
+                filternode=self.multiaddr_with_id,
+            )
+            for index, image in enumerate(nodes)
+        ]
+        for node in WakuCluster().start_all(specs):
             self.add_node_peer(node, [self.multiaddr_with_id])
             self.optional_nodes.append(node)
 
@@ -94,9 +104,9 @@ class StepsFilter(StepsCommon):
 
         sender.send_relay_message(message, pubsub_topic)
         delay(message_propagation_delay)
-        for index, peer in enumerate(peer_list):
+        responses = gather([self.get_filter_messages_async(message["contentTopic"], pubsub_topic=pubsub_topic, node=peer) for peer in peer_list])
+        for index, (peer, get_messages_response) in enumerate(zip(peer_list, responses)):
             logger.debug(f"Checking that peer NODE_{index + 2}:{peer.image} can find the published message")
-            get_messages_response = self.get_filter_messages(message["contentTopic"], pubsub_topic=pubsub_topic, node=peer)
             assert get_messages_response, f"Peer NODE_{index + 2}:{peer.image} couldn't find any messages"
             assert len(get_messages_response) == 1, f"Expected 1 message but got {len(get_messages_response)}"
             waku_message = WakuMessage(get_messages_response)
@@ -132,7 +142,7 @@ class StepsFilter(StepsCommon):
                 {"requestId": request_id, "contentFilters": content_topic_list, "pubsubTopic": pubsub_topic}, node=node
             )
 
-    @retry(stop=stop_after_delay(60), wait=wait_fixed(1), reraise=True)
+    @retry_with_backoff(timeout=60, max_wait=1)
     @allure.step
     def create_filter_subscription_with_retry(self, subscription, node=None):
         return self.create_filter_subscription(subscription, node)
@@ -204,3 +214,13 @@ class StepsFilter(StepsCommon):
             return node.get_filter_messages(content_topic)
         else:
             raise NotImplementedError("Not implemented for this node type")
+
+    async def get_filter_messages_async(self, content_topic, pubsub_topic=None, node=None):
+        if node is None:
+            node = self.node2
+        if node.is_gowaku():
+            return await node.get_filter_messages_async(content_topic, pubsub_topic)
+        elif node.is_nwaku():
+            return await node.get_filter_messages_async(content_topic)
+        else:
+            raise NotImplementedError("Not implemented for this node type")
@@ -13,7 +13,7 @@ from src.env_vars import (
 from src.node.waku_node import WakuNode
 from src.steps.common import StepsCommon
 from src.test_data import VALID_PUBSUB_TOPICS
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.libs.retrying import retry_with_backoff
 
 logger = get_custom_logger(__name__)
 
@@ -140,7 +140,7 @@ class StepsLightPush(StepsCommon):
         return payload
 
     @allure.step
-    @retry(stop=stop_after_delay(120), wait=wait_fixed(1), reraise=True)
+    @retry_with_backoff(timeout=120, max_wait=1)
     def subscribe_and_light_push_with_retry(self):
         self.subscribe_to_pubsub_topics_via_relay()
         self.light_push_node1.send_light_push_message(self.create_payload())
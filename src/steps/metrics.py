@@ -1,7 +1,7 @@
 import re
 from src.libs.custom_logger import get_custom_logger
 import allure
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.libs.retrying import retry_with_backoff
 
 from src.test_data import METRICS_WITH_INITIAL_VALUE_ZERO
 
@@ -32,7 +32,7 @@ class StepsMetrics:
 
     @allure.step
     def wait_for_metric(self, node, metric_name, expected_value, timeout_duration=90):
-        @retry(stop=stop_after_delay(timeout_duration), wait=wait_fixed(1), reraise=True)
+        @retry_with_backoff(timeout=timeout_duration, max_wait=1)
         def check_metric_with_retry():
             self.check_metric(node, metric_name, expected_value)
 
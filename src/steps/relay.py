@@ -4,6 +4,7 @@ from time import time
 import pytest
 import allure
 from src.libs.common import to_base64, delay
+from src.node.api_clients.async_base_client import gather
 from src.node.waku_message import WakuMessage
 from src.env_vars import (
     NODE_1,
@@ -11,7 +12,8 @@ from src.env_vars import (
     ADDITIONAL_NODES,
 )
 from src.node.waku_node import WakuNode
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.node.waku_cluster import NodeSpec, WakuCluster
+from src.libs.retrying import retry_with_backoff
 from src.steps.common import StepsCommon
 from src.test_data import VALID_PUBSUB_TOPICS
 
@@ -32,8 +34,7 @@ class StepsRelay(StepsCommon):
     @pytest.fixture(scope="function")
     def setup_main_relay_nodes(self, request):
         logger.debug(f"Running fixture setup: {inspect.currentframe().f_code.co_name}")
-        self.node1 = WakuNode(NODE_1, f"node1_{request.cls.test_id}")
-        self.node1.start(relay="true")
+        self.node1 = self.start_node(NODE_1, f"node1_{request.cls.test_id}", pooled=True, relay="true")
         self.enr_uri = self.node1.get_enr_uri()
         self.multiaddr_with_id = self.node1.get_multiaddr_with_id()
         self.node2 = WakuNode(NODE_2, f"node2_{request.cls.test_id}")
@@ -48,9 +49,11 @@ class StepsRelay(StepsCommon):
             nodes = [node.strip() for node in ADDITIONAL_NODES.split(",")]
         else:
             pytest.skip("ADDITIONAL_NODES is empty, cannot run test")
-        for index, node in enumerate(nodes):
-            node = WakuNode(node, f"node{index + 3}_{request.cls.test_id}")
-            node.start(relay="true", discv5_bootstrap_node=self.enr_uri)
+        specs = [
+            NodeSpec(f"node{index + 3}", image, f"node{index + 3}_{request.cls.test_id}", relay="true", discv5_bootstrap_node=self.enr_uri)
+            for index, image in enumerate(nodes)
+        ]
+        for node in WakuCluster().start_all(specs):
             self.add_node_peer(node, [self.multiaddr_with_id])
             self.optional_nodes.append(node)
 
@@ -119,9 +122,10 @@ class StepsRelay(StepsCommon):
 
         sender.send_relay_message(message, pubsub_topic)
         delay(message_propagation_delay)
-        for index, peer in enumerate(peer_list):
+        # all peers are polled at once, the checks below only look at the collected responses
+        responses = gather([peer.get_relay_messages_async(pubsub_topic) for peer in peer_list])
+        for index, (peer, get_messages_response) in enumerate(zip(peer_list, responses)):
             logger.debug(f"Checking that peer NODE_{index + 1}:{peer.image} can find the published message")
-            get_messages_response = peer.get_relay_messages(pubsub_topic)
             assert get_messages_response, f"Peer NODE_{index + 1}:{peer.image} couldn't find any messages"
             assert len(get_messages_response) == 1, f"Expected 1 message but got {len(get_messages_response)}"
             waku_message = WakuMessage(get_messages_response)
@@ -140,7 +144,7 @@ class StepsRelay(StepsCommon):
     def wait_for_published_message_to_reach_relay_peer(
         self, timeout_duration=120, time_between_retries=1, pubsub_topic=None, sender=None, peer_list=None
     ):
-        @retry(stop=stop_after_delay(timeout_duration), wait=wait_fixed(time_between_retries), reraise=True)
+        @retry_with_backoff(timeout=timeout_duration, max_wait=time_between_retries)
         def publish_and_check_relay_peer():
             message = {"payload": to_base64(self.test_payload), "contentTopic": self.test_content_topic, "timestamp": int(time() * 1e9)}
             self.check_published_message_reaches_relay_peer(message, pubsub_topic=pubsub_topic, sender=sender, peer_list=peer_list)
@@ -158,7 +162,7 @@ class StepsRelay(StepsCommon):
             node.delete_relay_subscriptions(pubsub_topic_list)
 
     @allure.step
-    @retry(stop=stop_after_delay(120), wait=wait_fixed(1), reraise=True)
+    @retry_with_backoff(timeout=120, max_wait=1)
     def subscribe_and_publish_with_retry(self, node_list, pubsub_topic_list):
         self.ensure_relay_subscriptions_on_nodes(node_list, pubsub_topic_list)
         self.check_published_message_reaches_relay_peer()
@@ -180,8 +184,10 @@ class StepsRelay(StepsCommon):
             nodes = [node.strip() for node in ADDITIONAL_NODES.split(",")]
         else:
             pytest.skip("ADDITIONAL_NODES is empty, cannot run test")
-        for index, node in enumerate(nodes):
-            node = WakuNode(node, f"node{index + 3}_{self.test_id}")
-            node.start(relay="true", discv5_bootstrap_node=self.enr_uri, **kwargs)
+        specs = [
+            NodeSpec(f"node{index + 3}", image, f"node{index + 3}_{self.test_id}", relay="true", discv5_bootstrap_node=self.enr_uri, **kwargs)
+            for index, image in enumerate(nodes)
+        ]
+        for node in WakuCluster().start_all(specs):
             self.add_node_peer(node, [self.multiaddr_with_id])
             self.optional_nodes.append(node)
@@ -12,6 +12,7 @@ from src.env_vars import (
     ADDITIONAL_NODES,
 )
 from src.node.waku_node import WakuNode
+from src.node.waku_cluster import NodeSpec, WakuCluster
 from src.steps.common import StepsCommon
 from src.steps.relay import StepsRelay
 
@@ -54,17 +55,21 @@ class StepsSharding(StepsRelay):
             nodes = [node.strip() for node in ADDITIONAL_NODES.split(",")]
         else:
             pytest.skip("ADDITIONAL_NODES is empty, cannot run test")
-        for index, node in enumerate(nodes):
-            node = WakuNode(node, f"node{index + 3}_{self.test_id}")
-            node.start(relay="true", discv5_bootstrap_node=self.enr_uri, **kwargs)
+        specs = [
+            NodeSpec(f"node{index + 3}", image, f"node{index + 3}_{self.test_id}", relay="true", discv5_bootstrap_node=self.enr_uri, **kwargs)
+            for index, image in enumerate(nodes)
+        ]
+        for node in WakuCluster().start_all(specs):
             self.add_node_peer(node, [self.multiaddr_with_id])
             self.optional_nodes.append(node)
 
     @allure.step
     def setup_nwaku_relay_nodes(self, num_nodes, **kwargs):
-        for index in range(num_nodes):
-            node = WakuNode(DEFAULT_NWAKU, f"node{index + 3}_{self.test_id}")
-            node.start(relay="true", discv5_bootstrap_node=self.enr_uri, **kwargs)
+        specs = [
+            NodeSpec(f"node{index + 3}", DEFAULT_NWAKU, f"node{index + 3}_{self.test_id}", relay="true", discv5_bootstrap_node=self.enr_uri, **kwargs)
+            for index in range(num_nodes)
+        ]
+        for node in WakuCluster().start_all(specs):
             self.add_node_peer(node, [self.multiaddr_with_id])
             self.optional_nodes.append(node)
 
@@ -1,12 +1,19 @@
 import inspect
+import json
+from time import perf_counter, time
 
 import requests
 
 from src.libs.custom_logger import get_custom_logger
 import pytest
 import allure
-from src.libs.common import delay
+from src.libs.common import delay, to_base64
+from src.node.api_clients.async_base_client import gather, run_async
+from src.node.store_consistency import check_store_consistency
+from src.node.store_diff import diff_store_ranges
 from src.node.store_response import StoreResponse
+from src.node.store_seeder import confirm_stored, publish_from_senders
+from src.node.store_sync_convergence import wait_for_convergence
 from src.node.waku_message import WakuMessage
 from src.env_vars import (
     ADDITIONAL_NODES,
@@ -14,9 +21,10 @@ from src.env_vars import (
     NODE_2,
 )
 from src.node.waku_node import WakuNode
+from src.node.waku_cluster import NodeSpec, WakuCluster
 from src.steps.common import StepsCommon
 from src.test_data import VALID_PUBSUB_TOPICS
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.libs.retrying import retry_with_backoff
 
 logger = get_custom_logger(__name__)
 
@@ -57,11 +65,14 @@ class StepsStore(StepsCommon):
     def setup_store_node(self, image, node_index, **kwargs):
         node = WakuNode(image, f"store_node{node_index}_{self.test_id}")
         node.start(discv5_bootstrap_node=self.enr_uri, storenode=self.multiaddr_list[0], **kwargs)
-        if kwargs["relay"] == "true":
+        self.register_store_node(node, relay=kwargs["relay"])
+        return node
+
+    def register_store_node(self, node, relay):
+        if relay == "true":
             self.main_publishing_nodes.extend([node])
         self.store_nodes.extend([node])
         self.add_node_peer(node, self.multiaddr_list)
-        return node
 
     @allure.step
     def setup_first_publishing_node(self, store="true", relay="true", **kwargs):
@@ -95,10 +106,22 @@ class StepsStore(StepsCommon):
             nodes = [node.strip() for node in node_list.split(",") if node]
         else:
             pytest.skip("ADDITIONAL_NODES/node_list is empty, cannot run test")
-        self.additional_store_nodes = []
-        for index, node in enumerate(nodes):
-            node = self.setup_store_node(node, node_index=index + 2, store="true", relay="false", **kwargs)
-            self.additional_store_nodes.append(node)
+        specs = [
+            NodeSpec(
+                f"store_node{index + 2}",
+                image,
+                f"store_node{index + 2}_{self.test_id}",
+                discv5_bootstrap_node=self.enr_uri,
+                storenode=self.multiaddr_list[0],
+                store="true",
+                relay="false",
+                **kwargs,
+            )
+            for index, image in enumerate(nodes)
+        ]
+        self.additional_store_nodes = WakuCluster().start_all(specs)
+        for node in self.additional_store_nodes:
+            self.register_store_node(node, relay="false")
 
     @allure.step
     def subscribe_to_pubsub_topics_via_relay(self, node=None, pubsub_topics=None):
@@ -137,7 +160,100 @@ class StepsStore(StepsCommon):
         delay(message_propagation_delay)
         return self.message
 
-    @retry(stop=stop_after_delay(30), wait=wait_fixed(1), reraise=True)
+    @allure.step
+    def publish_messages(
+        self, messages, via="relay", pubsub_topic=None, sender=None, concurrency=16, rate=None, ordered=False, message_propagation_delay=0.2
+    ):
+        if pubsub_topic is None:
+            pubsub_topic = self.test_pubsub_topic
+        if not sender:
+            sender = self.publishing_node1
+        results = sender.publish_many(messages, via=via, pubsub_topic=pubsub_topic, concurrency=concurrency, rate=rate, ordered=ordered)
+        failed = [result for result in results if result.error is not None]
+        assert not failed, f"{len(failed)} of {len(results)} messages were not accepted, first error: {failed[0].error}"
+        self.message = messages[-1]
+        # one propagation delay for the whole batch instead of one per message
+        delay(message_propagation_delay)
+        return results
+
+    @allure.step
+    def seed_messages(
+        self,
+        count=None,
+        messages=None,
+        via="relay",
+        senders=None,
+        store_nodes=None,
+        pubsub_topic=None,
+        workers=16,
+        rate=None,
+        confirm_timeout=60,
+        min_acceptance=1.0,
+    ):
+        """
+        Publishes `messages`, or `count` generated ones with increasing timestamps, from all `senders` at once
+        at up to `rate` msg/s, then confirms with batched hash lookups that every accepted message reached
+        each of `store_nodes`. Replaces per message publishing with a fixed propagation delay.
+        """
+        if pubsub_topic is None:
+            pubsub_topic = self.test_pubsub_topic
+        if messages is None:
+            base_timestamp = int(time() * 1e9)
+            messages = [self.create_message(payload=to_base64(f"Message_{index}"), timestamp=base_timestamp + index * 1000) for index in range(count)]
+        senders = senders or [self.publishing_node1]
+        store_nodes = self.store_nodes if store_nodes is None else store_nodes
+        report = run_async(publish_from_senders(senders, messages, via, pubsub_topic, workers, rate))
+        self.message = messages[-1]
+        started = time()
+        report.missing = self.confirm_messages_stored(store_nodes, report.accepted, pubsub_topic, timeout=confirm_timeout)
+        report.confirm_seconds = time() - started
+        logger.info(f"Seeded store: {report.summary()}")
+        allure.attach(json.dumps(report.as_dict(), indent=2), name="Seed report", attachment_type=allure.attachment_type.JSON)
+        assert report.acceptance_ratio >= min_acceptance, f"Too few messages accepted: {report.summary()}"
+        assert report.confirmed, f"Accepted messages missing from store: {report.summary()}"
+        return report
+
+    @allure.step
+    def measure_store_query_db_cost(self, postgres_client, node=None, repetitions=10, **query):
+        # splits the time of store queries into what postgres spent executing them and what the node added on top
+        node = node or self.publishing_node1
+        postgres_client.reset_statement_stats()
+        started = perf_counter()
+        for _ in range(repetitions):
+            self.get_messages_from_store(node, **query)
+        rest_ms = (perf_counter() - started) * 1000
+        statements = postgres_client.statement_stats(like="messages")
+        db_ms = sum(statement["total_ms"] for statement in statements)
+        report = {
+            "queries": repetitions,
+            "rest_ms_per_query": round(rest_ms / repetitions, 3),
+            "db_ms_per_query": round(db_ms / repetitions, 3),
+            "node_ms_per_query": round((rest_ms - db_ms) / repetitions, 3),
+            "statements": statements,
+            "index_usage": postgres_client.index_usage(),
+            "table_sizes": postgres_client.table_sizes(),
+        }
+        logger.info(f"Store query cost: {report['rest_ms_per_query']}ms over REST, {report['db_ms_per_query']}ms in postgres")
+        allure.attach(json.dumps(report, indent=2, default=str), name="Store query db cost", attachment_type=allure.attachment_type.JSON)
+        return report
+
+    def confirm_messages_stored(self, store_nodes, messages, pubsub_topic=None, timeout=60):
+        # store node -> hashes of `messages` it didn't return for batched hash lookups within `timeout`
+        if pubsub_topic is None:
+            pubsub_topic = self.test_pubsub_topic
+
+        async def confirm(node):
+            expected = self.compute_message_hashes(pubsub_topic, messages, hash_type="hex" if node.is_nwaku() else "base64")
+
+            async def lookup(batch):
+                query = self.store_query_args(node, None, "false", pubsub_topic, None, None, None, ",".join(batch), None, len(batch), "true", "v3")
+                return StoreResponse(await node.get_store_messages_async(**query), node).message_hashes
+
+            return await confirm_stored(lookup, expected, timeout=timeout)
+
+        return dict(zip(store_nodes, gather([confirm(node) for node in store_nodes])))
+
+    @retry_with_backoff(timeout=30, max_wait=1)
     @allure.step
     def get_messages_from_store_with_retry(self, node):
         return self.get_messages_from_store(node, page_size=5)
@@ -158,6 +274,64 @@ class StepsStore(StepsCommon):
         ascending="true",
         store_v="v3",
         **kwargs,
+    ):
+        store_response = node.get_store_messages(
+            **self.store_query_args(
+                node,
+                peer_addr,
+                include_data,
+                pubsub_topic,
+                content_topics,
+                start_time,
+                end_time,
+                hashes,
+                cursor,
+                page_size,
+                ascending,
+                store_v,
+                **kwargs,
+            )
+        )
+        return self.checked_store_response(store_response, node)
+
+    def iter_store(
+        self,
+        node,
+        page_size=100,
+        max_pages=None,
+        peer_addr=None,
+        include_data=None,
+        pubsub_topic=None,
+        content_topics=None,
+        start_time=None,
+        end_time=None,
+        hashes=None,
+        cursor=None,
+        ascending="true",
+        store_v="v3",
+        **kwargs,
+    ):
+        query = self.store_query_args(
+            node, peer_addr, include_data, pubsub_topic, content_topics, start_time, end_time, hashes, cursor, page_size, ascending, store_v, **kwargs
+        )
+        query.pop("page_size")
+        return node.iter_store(page_size=page_size, max_pages=max_pages, build_page=self.checked_store_response, **query)
+
+    def store_query_args(
+        self,
+        node,
+        peer_addr,
+        include_data,
+        pubsub_topic,
+        content_topics,
+        start_time,
+        end_time,
+        hashes,
+        cursor,
+        page_size,
+        ascending,
+        store_v,
+        **kwargs,
     ):
         if pubsub_topic is None:
             pubsub_topic = self.test_pubsub_topic
@@ -168,7 +342,7 @@ class StepsStore(StepsCommon):
                 content_topics = None
                 pubsub_topic = None
                 peer_addr = self.multiaddr_list[0]
-        store_response = node.get_store_messages(
+        return dict(
             peer_addr=peer_addr,
             include_data=include_data,
             pubsub_topic=pubsub_topic,
@@ -182,6 +356,8 @@ class StepsStore(StepsCommon):
             store_v=store_v,
             **kwargs,
         )
+
+    def checked_store_response(self, store_response, node):
         store_response = StoreResponse(store_response, node)
         assert store_response.request_id is not None, "Request id is missing"
         assert store_response.status_code, "Status code is missing"
@@ -214,23 +390,32 @@ class StepsStore(StepsCommon):
             store_node = self.store_nodes
         elif not isinstance(store_node, list):
             store_node = [store_node]
-        for node in store_node:
+        # every store node is queried at once, the responses are then checked one by one
+        responses = gather(
+            [
+                node.get_store_messages_async(
+                    **self.store_query_args(
+                        node,
+                        peer_addr,
+                        include_data,
+                        pubsub_topic,
+                        content_topics,
+                        start_time,
+                        end_time,
+                        hashes,
+                        cursor,
+                        page_size,
+                        ascending,
+                        store_v,
+                        **kwargs,
+                    )
+                )
+                for node in store_node
+            ]
+        )
+        for node, response in zip(store_node, responses):
             logger.debug(f"Checking that peer {node.image} can find the stored messages")
-            self.store_response = self.get_messages_from_store(
-                node=node,
-                peer_addr=peer_addr,
-                include_data=include_data,
-                pubsub_topic=pubsub_topic,
-                content_topics=content_topics,
-                start_time=start_time,
-                end_time=end_time,
-                hashes=hashes,
-                cursor=cursor,
-                page_size=page_size,
-                ascending=ascending,
-                store_v=store_v,
-                **kwargs,
-            )
+            self.store_response = self.checked_store_response(response, node)
 
             assert self.store_response.messages, f"Peer {node.image} couldn't find any messages. Actual response: {self.store_response.resp_json}"
             assert len(self.store_response.messages) >= len(
@@ -256,6 +441,68 @@ class StepsStore(StepsCommon):
                         expected_hash == actual_hash
                     ), f"Message hash at index {idx} returned by store doesn't match the computed message hash {expected_hash}. Actual hash: {actual_hash}"
 
+    @allure.step
+    def check_store_consistency(self, store_nodes, messages, pubsub_topic=None, page_size=100, ordered=True):
+        # every node must hold exactly `messages`, in publishing order unless `ordered` is off
+        if pubsub_topic is None:
+            pubsub_topic = self.test_pubsub_topic
+        expected = {}
+        for node_type, hash_type in [("nwaku", "hex"), ("gowaku", "base64")]:
+            if any(node.type() == node_type for node in store_nodes):
+                expected[node_type] = self.compute_message_hashes(pubsub_topic, messages, hash_type=hash_type)
+        report = check_store_consistency(
+            store_nodes,
+            lambda node: expected[node.type()],
+            lambda node: list(self.iter_store(node, page_size=page_size, pubsub_topic=pubsub_topic).message_hashes()),
+            ordered=ordered,
+        )
+        assert report.consistent, f"Stores of {[node.image for node in report.inconsistent_nodes()]} differ:\n{report.summary()}"
+        return report
+
+    @allure.step
+    def wait_for_store_sync(self, store_nodes, messages, pubsub_topic=None, timeout=60, page_size=100):
+        # replaces fixed sleeps after publishing, returns when every store holds all `messages`
+        if pubsub_topic is None:
+            pubsub_topic = self.test_pubsub_topic
+        expected = {}
+        for node_type, hash_type in [("nwaku", "hex"), ("gowaku", "base64")]:
+            if any(node.type() == node_type for node in store_nodes):
+                expected[node_type] = set(self.compute_message_hashes(pubsub_topic, messages, hash_type=hash_type))
+        convergence = wait_for_convergence(
+            store_nodes,
+            lambda node: expected[node.type()],
+            lambda node: set(self.iter_store(node, page_size=page_size, pubsub_topic=pubsub_topic).message_hashes()),
+            timeout=timeout,
+        )
+        behind = {node.image: result.missing for node, result in convergence.items() if result.converged_after is None}
+        assert not behind, f"Stores still missing messages after {timeout}s: {behind}"
+        return convergence
+
+    @allure.step
+    def diff_stores(self, left, right, start_time, end_time, bucket_count=16, pubsub_topic=None, page_size=100, fetch_contents=True):
+        # bandwidth follows the number of differences, not the store size: hashes per bucket, full messages only where they differ
+        def fetch_hashes(node, bucket_start, bucket_end):
+            pager = self.iter_store(
+                node, page_size=page_size, include_data="false", pubsub_topic=pubsub_topic, start_time=bucket_start, end_time=bucket_end
+            )
+            return list(pager.message_hashes()), pager.bytes_received
+
+        def fetch_messages(node, hashes):
+            messages, received = {}, 0
+            for index in range(0, len(hashes), page_size):
+                batch = hashes[index : index + page_size]
+                pager = self.iter_store(node, page_size=len(batch), include_data="true", pubsub_topic=pubsub_topic, hashes=",".join(batch))
+                for page in pager.pages():
+                    messages.update(zip(page.message_hashes, page.messages))
+                received += pager.bytes_received
+            return messages, received
+
+        diff = diff_store_ranges(
+            left, right, start_time, end_time, fetch_hashes, fetch_messages if fetch_contents else None, bucket_count=bucket_count
+        )
+        logger.info(diff.summary())
+        return diff
+
     @allure.step
     def check_store_returns_empty_response(self, pubsub_topic=None):
         if not pubsub_topic:
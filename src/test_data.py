@@ -170,6 +170,12 @@ SAMPLE_TIMESTAMPS = [
 
 PUBSUB_TOPICS_RLN = ["/waku/2/rs/1/0"]
 
+# log lines announcing start up stages; they only wake up the readiness checks, REST stays the source of truth
+NODE_STARTUP_LOG_MARKERS = {
+    "nwaku": {"rest_up": ["Starting REST HTTP server"], "health_ready": ["Node setup complete"]},
+    "gowaku": {"rest_up": ["server started"]},
+}
+
 LOG_ERROR_KEYWORDS = [
     "crash",
     "fatal",
@@ -0,0 +1,19 @@
+import pytest
+from src.env_vars import NODE_1, RUN_BENCHMARKS, STORE_BENCHMARK_VOLUMES
+from src.steps.store_benchmark import STORE_BACKENDS, StepsStoreBenchmark, benchmark_volumes
+
+
+@pytest.mark.skipif(RUN_BENCHMARKS != "true", reason="Benchmarks only run with RUN_BENCHMARKS=true")
+@pytest.mark.skipif("go-waku" in NODE_1, reason="Benchmark measures the nwaku store")
+class TestStoreQueryLatency(StepsStoreBenchmark):
+    @pytest.mark.timeout(0)
+    @pytest.mark.parametrize("volume", benchmark_volumes(STORE_BENCHMARK_VOLUMES))
+    @pytest.mark.parametrize("backend", STORE_BACKENDS)
+    def test_store_query_latency(self, request, backend, volume):
+        if backend == "postgres":
+            request.getfixturevalue("start_postgres_container")
+        node = self.start_benchmark_store(backend)
+        first_timestamp, last_timestamp, samples = self.seed_store(volume)
+        queries = self.store_query_sweep(first_timestamp, last_timestamp, samples)
+        results = self.benchmark_store_queries(node, queries, backend, volume)
+        assert not any(result["errors"] for result in results), f"Store queries failed on {backend}: {results}"
@@ -0,0 +1,16 @@
+import pytest
+from src.env_vars import NODE_1, RUN_BENCHMARKS, STORE_SYNC_BENCHMARK_MESSAGES, STORE_SYNC_BENCHMARK_NODES
+from src.steps.store_benchmark import StepsStoreBenchmark, benchmark_volumes
+
+
+@pytest.mark.skipif(RUN_BENCHMARKS != "true", reason="Benchmarks only run with RUN_BENCHMARKS=true")
+@pytest.mark.skipif("go-waku" in NODE_1, reason="Store sync is only implemented by nwaku")
+class TestStoreSyncConvergence(StepsStoreBenchmark):
+    @pytest.mark.timeout(0)
+    @pytest.mark.parametrize("node_count", benchmark_volumes(STORE_SYNC_BENCHMARK_NODES))
+    @pytest.mark.parametrize("message_count", benchmark_volumes(STORE_SYNC_BENCHMARK_MESSAGES))
+    def test_store_sync_convergence(self, message_count, node_count):
+        self.start_sync_nodes(node_count)
+        results = self.benchmark_store_sync(message_count, node_count)
+        behind = [result for result in results if result["converged_after_s"] is None]
+        assert not behind, f"Stores did not converge: {behind}"
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import inspect
+import allure
 import glob
 from src.libs.custom_logger import get_custom_logger
 import os
@@ -8,8 +9,16 @@ from datetime import datetime
 from time import time
 from uuid import uuid4
 from src.libs.common import attach_allure_file
+from src.libs.retrying import start_wait_budget, stop_wait_budget, wait_stats
 import src.env_vars as env_vars
 from src.data_storage import DS
+from src.node.api_clients.base_client import http_stats, request_log_stats
+from src.node.api_clients.latency import get_latency_recorder, write_latency_report
+from src.node.crash_watchdog import NodeCrashed
+from src.node.image_cache import configured_images, get_image_cache
+from src.node.log_collector import flush_container_logs
+from src.node.node_pool import get_node_pool, shutdown_node_pool
+from src.postgres_client import PostgresClient
 from src.postgres_setup import start_postgres, stop_postgres
 
 logger = get_custom_logger(__name__)
@@ -36,6 +45,52 @@ def set_allure_env_variables():
                 if attribute_name.isupper():
                     attribute_value = getattr(env_vars, attribute_name)
                     outfile.write(f"{attribute_name}={attribute_value}\n")
+            for image, metadata in get_image_cache().resolved().items():
+                outfile.write(f"{image}={metadata['digest'] or metadata['id']}\n")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def resolve_images(tmp_path_factory):
+    logger.debug(f"Running fixture setup: {inspect.currentframe().f_code.co_name}")
+    # xdist workers of one run share the parent of their temp dirs, the run id keeps consecutive runs apart
+    run_id = os.getenv("PYTEST_XDIST_TESTRUNUID", uuid4().hex)
+    shared_file = tmp_path_factory.getbasetemp().parent / f"waku_images_{run_id}.json"
+    get_image_cache().resolve_all(configured_images(), shared_file=str(shared_file))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def stop_node_pool():
+    yield
+    logger.debug(f"Running fixture teardown: {inspect.currentframe().f_code.co_name}")
+    shutdown_node_pool()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def report_http_stats():
+    yield
+    logger.debug(f"Running fixture teardown: {inspect.currentframe().f_code.co_name}")
+    stats = http_stats()
+    logger.info(f"REST clients sent {stats['requests']} requests over {stats['connections']} connections")
+    log_stats = request_log_stats()
+    logger.info(f"REST request logging: {log_stats['logged']} logged, {log_stats['skipped']} skipped, {log_stats['seconds']:.3f}s spent")
+    latency_report = get_latency_recorder().session_report()
+    if latency_report:
+        worker = os.getenv("PYTEST_XDIST_WORKER", "master")
+        content = write_latency_report(latency_report, os.path.join(env_vars.REST_LATENCY_DIR, f"session_{worker}.json"))
+        allure.attach(content, name="REST latency of the session", attachment_type=allure.attachment_type.JSON)
+    sites = wait_stats()
+    if sites:
+        worker = os.getenv("PYTEST_XDIST_WORKER", "master")
+        content = write_latency_report(sites, os.path.join(env_vars.REST_LATENCY_DIR, f"waits_{worker}.json"))
+        allure.attach(content, name="Retry waits of the session", attachment_type=allure.attachment_type.JSON)
+        for site, stats in sorted(sites.items(), key=lambda item: item[1]["attempts"], reverse=True)[:10]:
+            logger.info(f"Wait {site}: {stats}")
+
+
+@pytest.fixture(scope="function")
+def node_pool():
+    # nodes leased from the pool are given back automatically by close_open_nodes
+    return get_node_pool()
 
 
 @pytest.fixture(scope="function", autouse=False)
@@ -45,6 +100,14 @@ def start_postgres_container():
     stop_postgres(pg_container)
 
 
+@pytest.fixture(scope="function", autouse=False)
+def postgres_client(start_postgres_container):
+    logger.debug(f"Running fixture setup: {inspect.currentframe().f_code.co_name}")
+    client = PostgresClient()
+    yield client
+    client.close()
+
+
 @pytest.fixture(scope="function", autouse=True)
 def test_id(request):
     # setting up an unique test id to be used where needed
@@ -67,28 +130,85 @@ def test_setup(request, test_id):
 
 
 @pytest.fixture(scope="function", autouse=True)
-def attach_logs_on_fail(request):
+def wait_budget(request):
+    # the effective pytest-timeout of the test: marker, then --timeout, then the ini value
+    marker = request.node.get_closest_marker("timeout")
+    if marker and (marker.args or "timeout" in marker.kwargs):
+        timeout = marker.args[0] if marker.args else marker.kwargs["timeout"]
+    elif getattr(request.config.option, "timeout", None) is not None:
+        timeout = request.config.option.timeout
+    else:
+        timeout = request.config.getini("timeout")
+    if timeout and float(timeout) > 0:
+        start_wait_budget(max(float(timeout) - float(env_vars.WAIT_BUDGET_MARGIN), float(timeout) / 2))
+    yield
+    stop_wait_budget()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def report_rest_logging_cost():
+    before = request_log_stats()
+    yield
+    after = request_log_stats()
+    logger.debug(
+        f"REST request logging in this test: {after['logged'] - before['logged']} logged, "
+        f"{after['skipped'] - before['skipped']} skipped, {after['seconds'] - before['seconds']:.3f}s spent"
+    )
+
+
+@pytest.fixture(scope="function", autouse=True)
+def report_rest_latency(request, test_id):
+    recorder = get_latency_recorder()
+    recorder.start_test()
+    yield
+    latency_report = recorder.test_report()
+    if latency_report:
+        content = write_latency_report(latency_report, os.path.join(env_vars.REST_LATENCY_DIR, f"{request.cls.test_id}.json"))
+        allure.attach(content, name="REST latency", attachment_type=allure.attachment_type.JSON)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def attach_logs_on_fail(request, close_open_nodes):
+    # depends on close_open_nodes so it tears down first, while leased nodes are still known
     yield
     if env_vars.RUNNING_IN_CI and hasattr(request.node, "rep_call") and request.node.rep_call.failed:
         logger.debug(f"Running fixture teardown: {inspect.currentframe().f_code.co_name}")
         logger.debug("Test failed, attempting to attach logs to the allure reports")
+        flush_container_logs()
         for file in glob.glob(os.path.join(env_vars.DOCKER_LOG_DIR, "*" + request.cls.test_id + "*")):
             attach_allure_file(file)
+        # pooled nodes log under their pool name, not the test id
+        for node in DS.leased_nodes:
+            attach_allure_file(node.log_path)
+        for node in DS.waku_nodes + DS.leased_nodes:
+            if node.log_index is not None:
+                allure.attach(node.log_index.summary(), name=f"{node.image} log summary", attachment_type=allure.attachment_type.TEXT)
 
 
 @pytest.fixture(scope="function", autouse=True)
-def close_open_nodes(attach_logs_on_fail):
+def close_open_nodes():
     DS.waku_nodes = []
+    DS.leased_nodes = []
     yield
     logger.debug(f"Running fixture teardown: {inspect.currentframe().f_code.co_name}")
+    # stop and kill retry on their own timeouts, a budget used up by the test would leave them a single attempt
+    stop_wait_budget()
     crashed_containers = []
     for node in DS.waku_nodes:
         try:
             node.stop()
+        except NodeCrashed as ex:
+            crashed_containers.append(node.image)
+            logger.error(f"Container crashed during the test: {ex}")
         except Exception as ex:
             if "No such container" in str(ex):
                 crashed_containers.append(node.image)
             logger.error(f"Failed to stop container because of error {ex}")
+    # released after the test's own nodes stopped, so their connections to the pooled nodes are gone
+    for node in list(DS.leased_nodes):
+        if node.crashed:
+            crashed_containers.append(node.image)
+        get_node_pool().release(node)
     assert not crashed_containers, f"Containers {crashed_containers} crashed during the test!!!"
 
 
@@ -96,5 +216,5 @@ def close_open_nodes(attach_logs_on_fail):
 def check_waku_log_errors():
     yield
     logger.debug(f"Running fixture teardown: {inspect.currentframe().f_code.co_name}")
-    for node in DS.waku_nodes:
+    for node in DS.waku_nodes + DS.leased_nodes:
         node.check_waku_log_errors()
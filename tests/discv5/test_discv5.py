@@ -7,7 +7,7 @@ from src.steps.filter import StepsFilter
 from src.steps.light_push import StepsLightPush
 from src.steps.relay import StepsRelay
 from src.steps.store import StepsStore
-from tenacity import retry, stop_after_delay, wait_fixed
+from src.libs.retrying import retry_with_backoff
 
 logger = get_custom_logger(__name__)
 
@@ -19,12 +19,12 @@ class TestDiscv5(StepsRelay, StepsFilter, StepsStore, StepsLightPush):
         node.start(**kwargs)
         return node
 
-    @retry(stop=stop_after_delay(70), wait=wait_fixed(1), reraise=True)
+    @retry_with_backoff(timeout=70, max_wait=1)
     def wait_for_published_message_to_be_stored(self):
         self.publish_message()
         self.check_published_message_is_stored([self.store_node1], page_size=5, ascending="true")
 
-    @retry(stop=stop_after_delay(70), wait=wait_fixed(1), reraise=True)
+    @retry_with_backoff(timeout=70, max_wait=1)
     def wait_for_lightpushed_message_to_be_stored(self):
         self.check_light_pushed_message_reaches_receiving_peer(peer_list=[self.receiving_node1, self.receiving_node2])
 
@@ -1,4 +1,6 @@
+from src.env_vars import NODE_1
 from src.libs.custom_logger import get_custom_logger
+from src.node import log_collector
 from src.steps.relay import StepsRelay
 
 logger = get_custom_logger(__name__)
@@ -9,3 +11,10 @@ class TestLogs(StepsRelay):
         for node in self.main_nodes:
             metadata_protocol = "Created WakuMetadata protocol" if node.is_nwaku() else "metadata protocol started"
             assert node.search_waku_log_for_string(metadata_protocol), "Metadata protocol not mounted"
+
+    def test_logs_collected_when_attach_buffer_is_not_exposed(self, monkeypatch):
+        # forces the per container follow path the collector takes when the docker SDK internals change
+        monkeypatch.setattr(log_collector, "buffered_reader", lambda sock: None)
+        node = self.start_node(NODE_1, f"node1_{self.test_id}", relay="true")
+        metadata_protocol = "Created WakuMetadata protocol" if node.is_nwaku() else "metadata protocol started"
+        assert node.search_waku_log_for_string(metadata_protocol), "Logs not collected through the follow path"
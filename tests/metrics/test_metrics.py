@@ -10,6 +10,9 @@ from src.steps.store import StepsStore
 
 
 class TestMetrics(StepsRelay, StepsMetrics, StepsFilter, StepsLightPush, StepsStore):
+    # metrics are cumulative, a pooled node would carry over the counts of earlier tests
+    use_node_pool = False
+
     def test_metrics_initial_value(self):
         node = WakuNode(DEFAULT_NWAKU, f"node1_{self.test_id}")
         node.start(relay="true", filter="true", store="true", lightpush="true")
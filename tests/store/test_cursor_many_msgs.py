@@ -1,7 +1,5 @@
 import pytest
 from src.env_vars import NODE_1, NODE_2
-from src.libs.common import to_base64
-from src.node.store_response import StoreResponse
 from src.steps.store import StepsStore
 
 
@@ -13,18 +11,10 @@ class TestCursorManyMessages(StepsStore):
     @pytest.mark.timeout(540)
     @pytest.mark.store2000
     def test_get_multiple_2000_store_messages(self):
-        expected_message_hash_list = {"nwaku": [], "gowaku": []}
-        for i in range(2000):
-            message = self.create_message(payload=to_base64(f"Message_{i}"))
-            self.publish_message(message=message)
-            expected_message_hash_list["nwaku"].append(self.compute_message_hash(self.test_pubsub_topic, message, hash_type="hex"))
-            expected_message_hash_list["gowaku"].append(self.compute_message_hash(self.test_pubsub_topic, message, hash_type="base64"))
-        store_response = StoreResponse({"paginationCursor": "", "pagination_cursor": ""}, self.store_node1)
-        response_message_hash_list = []
-        while store_response.pagination_cursor is not None:
-            cursor = store_response.pagination_cursor
-            store_response = self.get_messages_from_store(self.store_node1, page_size=100, cursor=cursor)
-            for index in range(len(store_response.messages)):
-                response_message_hash_list.append(store_response.message_hash(index))
-        assert len(expected_message_hash_list[self.store_node1.type()]) == len(response_message_hash_list), "Message count mismatch"
-        assert expected_message_hash_list[self.store_node1.type()] == response_message_hash_list, "Message hash mismatch"
+        # store orders by timestamp, the seeded messages get distinct timestamps so the expected order doesn't depend on arrival order
+        messages = self.seed_messages(count=2000).messages
+        hash_type = "hex" if self.store_node1.is_nwaku() else "base64"
+        expected_message_hash_list = self.compute_message_hashes(self.test_pubsub_topic, messages, hash_type=hash_type)
+        response_message_hash_list = list(self.iter_store(self.store_node1, page_size=100).message_hashes())
+        assert len(expected_message_hash_list) == len(response_message_hash_list), "Message count mismatch"
+        assert expected_message_hash_list == response_message_hash_list, "Message hash mismatch"
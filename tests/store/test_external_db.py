@@ -1,7 +1,8 @@
 import pytest
 from src.libs.custom_logger import get_custom_logger
+from src.postgres_client import synthetic_messages
 from src.steps.store import StepsStore
-from src.env_vars import PG_PASS, PG_USER
+from src.env_vars import NODE_1, PG_PASS, PG_USER
 
 logger = get_custom_logger(__name__)
 
@@ -31,3 +32,19 @@ class TestExternalDb(StepsStore):
         self.publish_message(message=message)
         self.check_published_message_is_stored(page_size=5, ascending="true")
         assert len(self.store_response.messages) >= 2
+
+    @pytest.mark.timeout(120)
+    @pytest.mark.skipif("go-waku" in NODE_1, reason="Bulk loading writes the nwaku archive schema")
+    def test_bulk_loaded_messages_are_served_by_store(self, postgres_client):
+        messages = list(synthetic_messages(1000, self.test_content_topic))
+        assert postgres_client.bulk_load_messages(self.test_pubsub_topic, messages) == len(messages)
+        assert postgres_client.row_count() >= len(messages)
+        stored_hashes = set(self.iter_store(self.publishing_node1, page_size=100).message_hashes())
+        expected_hashes = self.compute_message_hashes(self.test_pubsub_topic, messages)
+        assert stored_hashes.issuperset(expected_hashes), f"{len(set(expected_hashes) - stored_hashes)} loaded messages not returned by store"
+
+    def test_store_query_db_cost(self, postgres_client):
+        self.seed_messages(count=100, store_nodes=[self.publishing_node1])
+        # the timings are attached to the report, background statements of the node make them unfit for assertions
+        report = self.measure_store_query_db_cost(postgres_client, page_size=20)
+        assert report["statements"], "No store query reached postgres"
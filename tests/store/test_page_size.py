@@ -24,8 +24,7 @@ class TestPageSize(StepsStore):
             assert len(store_response.messages) == 20, "Message count mismatch"
 
     def test_max_page_size(self):
-        for i in range(200):
-            self.publish_message(message=self.create_message(payload=to_base64(f"Message_{i}")))
+        self.seed_messages(count=200)
         for node in self.store_nodes:
             store_response = self.get_messages_from_store(node, page_size=200)
             assert len(store_response.messages) == 100, "Message count mismatch"
@@ -39,8 +38,7 @@ class TestPageSize(StepsStore):
             assert len(store_response.messages) == page_size, "Message count mismatch"
 
     def test_extreme_number_page_size(self):
-        for i in range(150):
-            self.publish_message(message=self.create_message(payload=to_base64(f"Message_{i}")))
+        self.seed_messages(count=150)
         for node in self.store_nodes:
             store_response = self.get_messages_from_store(node, page_size=1000000)
             assert len(store_response.messages) == 100, "Message count mismatch"
@@ -19,8 +19,7 @@ class TestSorting(StepsStore):
         for node in self.store_nodes:
             store_response = self.get_messages_from_store(node, page_size=5, ascending=ascending)
             response_message_hash_list = []
-            for index in range(len(store_response.messages)):
-                response_message_hash_list.append(store_response.message_hash(index))
+            response_message_hash_list.extend(store_response.message_hashes)
             if ascending == "true":
                 assert response_message_hash_list == expected_message_hash_list[node.type()][:5], "Message hash mismatch for acending order"
             else:
@@ -38,6 +37,5 @@ class TestSorting(StepsStore):
         for node in self.store_nodes:
             store_response = self.get_messages_from_store(node, ascending=ascending, page_size=2)
             response_message_hash_list = []
-            for index in range(len(store_response.messages)):
-                response_message_hash_list.append(store_response.message_hash(index))
+            response_message_hash_list.extend(store_response.message_hashes)
             assert response_message_hash_list == expected_message_hash_list[node.type()][:2], "pages aren't forward as expected"